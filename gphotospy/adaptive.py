@@ -0,0 +1,232 @@
+import math
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+# Kinds of transfer
+UPLOAD = "upload"
+DOWNLOAD = "download"
+# HTTP statuses telling that the server is throttling
+THROTTLE_STATUS = (429, 503)
+
+_local = threading.local()
+
+
+class _Slot:
+    """ A transfer in progress: what it saw, to be reported at the end """
+
+    def __init__(self, size):
+        self.size = size
+        self.throttled = False
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit adjusted by AIMD (additive increase,
+    multiplicative decrease), as TCP does with its window.
+
+    While the transfers are healthy the limit grows by about one each
+    time limit transfers complete; when the server throttles (429, 503),
+    a transfer fails, or its latency rises above latency_tolerance times
+    the usual one, the limit is multiplied by decrease. A single
+    congestion episode cuts the limit once: the transfers started
+    before the cut do not cut it again.
+
+    Latencies are compared among transfers of similar size (within
+    a factor of about 1.4), since each request has a fixed overhead:
+    neither big files nor small ones look like slow ones.
+
+    Examples
+    --------
+    Imports
+
+    >>> from gphotospy import adaptive
+
+    Let uploads and downloads find their concurrency, up to 32; the
+    workers of stage_many() become the maximum number of threads
+
+    >>> adaptive.enable(max_limit=32)
+    >>> media_manager.stage_many(files, workers=32)
+
+    Monitor the current limit
+
+    >>> adaptive.get_limiter(adaptive.UPLOAD).limit
+    11
+    """
+
+    def __init__(self,
+                 initial=4,
+                 min_limit=1,
+                 max_limit=32,
+                 increase=1.0,
+                 decrease=0.5,
+                 latency_tolerance=2.0,
+                 smoothing=0.1):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        initial: int, optional
+            Initial limit (default 4)
+        min_limit: int, optional
+            Minimum limit (default 1)
+        max_limit: int, optional
+            Maximum limit (default 32)
+        increase: float, optional
+            Growth of the limit each limit healthy transfers (default 1)
+        decrease: float, optional
+            Factor of the limit on congestion (default 0.5)
+        latency_tolerance: float, optional
+            Latency, relative to the usual one, seen as congestion
+            (default 2.0)
+        smoothing: float, optional
+            Weight of a new latency in the usual one (default 0.1)
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self._limit = float(min(max(initial, min_limit), max_limit))
+        self._in_flight = 0
+        # Usual latency of each size bucket (see _bucket())
+        self._latency = {}
+        self._last_cut = 0.0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self):
+        """ Current concurrency limit """
+        return int(self._limit)
+
+    @property
+    def in_flight(self):
+        """ Transfers in progress """
+        return self._in_flight
+
+    def stats(self):
+        """ Current state, for monitoring """
+        with self._condition:
+            return {
+                "limit": int(self._limit),
+                "in_flight": self._in_flight,
+                "latency": dict(self._latency)
+            }
+
+    @staticmethod
+    def _bucket(size):
+        """ Half-octave of the size, None if unknown """
+        if not size:
+            return None
+        return int(2 * math.log2(size))
+
+    def acquire(self):
+        """ Waits for a free slot; returns the start time of the transfer """
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._in_flight += 1
+        return time.monotonic()
+
+    def release(self, started, size=None, congested=False):
+        """
+        Frees the slot of a transfer started at started (as returned by
+        acquire()), adjusting the limit
+
+        Parameters
+        ----------
+        started: float
+            Start time of the transfer
+        size: int, optional
+            Bytes transferred, if known
+        congested: bool, optional
+            True if the transfer was throttled or failed
+        """
+        now = time.monotonic()
+        latency = now - started
+        bucket = self._bucket(size)
+        with self._condition:
+            self._in_flight -= 1
+            usual = self._latency.get(bucket)
+            if not congested and usual is not None:
+                congested = latency > self.latency_tolerance * usual
+            if not congested or usual is None:
+                # The usual latency follows slowly a lasting change
+                self._latency[bucket] = latency if usual is None else (
+                    (1 - self.smoothing) * usual + self.smoothing * latency)
+            if congested:
+                if started >= self._last_cut:
+                    self._limit = max(self.min_limit,
+                                      self._limit * self.decrease)
+                    self._last_cut = now
+                    logging.debug("concurrency limit cut to %d",
+                                  int(self._limit))
+            else:
+                self._limit = min(self.max_limit,
+                                  self._limit + self.increase / self._limit)
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, size=None):
+        """
+        Context of a transfer: waits for a free slot, and frees it at
+        the end. The transfer is congested if it raises, or if a
+        throttling status is observed (see observe()) meanwhile
+        """
+        started = self.acquire()
+        current = _Slot(size)
+        previous = getattr(_local, "slot", None)
+        _local.slot = current
+        try:
+            yield current
+        except BaseException:
+            current.throttled = True
+            raise
+        finally:
+            _local.slot = previous
+            self.release(started, current.size, current.throttled)
+
+
+def observe(status):
+    """ Reports the HTTP status of a response to the current transfer """
+    current = getattr(_local, "slot", None)
+    if current is not None and status in THROTTLE_STATUS:
+        current.throttled = True
+
+
+_limiters = {}
+
+
+def enable(kind=None, **kwargs):
+    """
+    Enables the adaptive concurrency of the uploads and of the downloads
+    (or only of kind, UPLOAD or DOWNLOAD), with a new AdaptiveLimiter
+    built with the given parameters
+    """
+    for k in (UPLOAD, DOWNLOAD) if kind is None else (kind,):
+        _limiters[k] = AdaptiveLimiter(**kwargs)
+
+
+def disable(kind=None):
+    """ Disables the adaptive concurrency (of all, or of kind) """
+    for k in (UPLOAD, DOWNLOAD) if kind is None else (kind,):
+        _limiters.pop(k, None)
+
+
+def get_limiter(kind):
+    """ Returns the limiter of UPLOAD or DOWNLOAD, or None """
+    return _limiters.get(kind)
+
+
+@contextmanager
+def slot(kind, size=None):
+    """ Slot of a transfer of kind, if its limiter is enabled """
+    limiter = _limiters.get(kind)
+    if limiter is None:
+        yield _Slot(size)
+        return
+    with limiter.slot(size) as current:
+        yield current
@@ -1,3 +1,30 @@
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from .utils import (batches, fields_mask, ContextThreadPoolExecutor,
+                    Paginator)
+from .executor import execute
+
+# Maximum number of calls in a batch HTTP request
+BATCH_LIMIT = 50
+# Maximum number of media items added or removed per request
+MEDIA_ITEMS_LIMIT = 50
+
+
+class BatchMediaItemsError(Exception):
+    """
+    Exception raised when chunks of batchAddMediaItems() or
+    batchRemoveMediaItems() fail; reports holds the report of each chunk
+    """
+
+    def __init__(self, msg="", reports=None):
+        self.msg = msg
+        self.reports = reports if reports is not None else []
+
+    def __str__(self):
+        return(repr(self.msg))
+
 
 class POSITION:
     """
@@ -108,6 +135,80 @@ def geolocate(name: str, lat: float, lon: float):
     }
 
 
+def _enrichment_item(result):
+    return result.get("enrichmentItem")
+
+
+def _share_info(result):
+    return result.get("shareInfo")
+
+
+class AlbumBatch:
+    """
+    Calls collected in batch HTTP requests, see Album.batch()
+    """
+
+    def __init__(self, service, limit=BATCH_LIMIT):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        service: Resource
+            The googleapiclient service
+        limit: int, optional
+            Calls per batch HTTP request (default BATCH_LIMIT)
+        """
+        self._service = service
+        self._limit = min(limit, BATCH_LIMIT)
+        self._calls = []
+
+    def add(self, request, transform=None):
+        """
+        Adds the request to the batch, sending the batch if full.
+        Returns a Future of the transformed result.
+        """
+        future = Future()
+        self._calls.append((request, transform, future))
+        if len(self._calls) >= self._limit:
+            self.flush()
+        return future
+
+    def flush(self):
+        """ Sends the calls collected so far, in a batch HTTP request """
+        calls = self._calls
+        self._calls = []
+        if not calls:
+            return
+
+        def callback(request_id, response, exception):
+            _, transform, future = calls[int(request_id)]
+            if exception is not None:
+                future.set_exception(exception)
+            elif transform is not None:
+                future.set_result(transform(response))
+            else:
+                future.set_result(response)
+
+        batch = self._service.new_batch_http_request()
+        for i, (request, _, _) in enumerate(calls):
+            batch.add(request, callback=callback, request_id=str(i))
+        try:
+            # Calls of any kind: retried only if refused by the server
+            execute(batch, idempotent=False, cost=len(calls))
+        except Exception as e:
+            for _, _, future in calls:
+                if not future.done():
+                    future.set_exception(e)
+
+    def cancel(self):
+        """ Drops the calls not yet sent, cancelling their futures """
+        calls = self._calls
+        self._calls = []
+        for _, _, future in calls:
+            future.cancel()
+
+
 class Album:
     """
     Album manager
@@ -171,6 +272,8 @@ class Album:
 
         self._service = service["service"]
         self._secrets = service["secrets"]
+        # Batch of the calling thread, if inside batch()
+        self._local = threading.local()
 
     # UTILITIES
     def set_pagination(self, n: int):
@@ -234,17 +337,78 @@ class Album:
 
         self._SHOW_ONLY_CREATED = val
 
+    @contextmanager
+    def batch(self, limit=BATCH_LIMIT):
+        """
+        Context in which the calls of this thread to add_enrichment(),
+        add_location(), add_map(), add_text(), batchAddMediaItems(),
+        batchRemoveMediaItems(), create(), get(), share() and unshare()
+        are collected in batch HTTP requests, instead of being sent
+        one by one.
+
+        Inside the context these methods return a Future of their
+        result. A batch request is sent every limit calls, and when the
+        context exits; if the context exits on an exception, the calls
+        not yet sent are dropped and their futures cancelled.
+
+        Parameters
+        ----------
+        limit: int, optional
+            Calls per batch HTTP request, at most BATCH_LIMIT (default)
+
+        Yields
+        ------
+        AlbumBatch, whose flush() method sends the calls collected so far
+
+        Examples
+        --------
+        Titles of many albums, with a request every 50 albums
+
+        >>> with album_manager.batch():
+        ...     futures = [album_manager.get(id) for id in album_ids]
+        >>> titles = [f.result().get("title") for f in futures]
+        """
+        previous = getattr(self._local, "batch", None)
+        batch = AlbumBatch(self._service, limit)
+        self._local.batch = batch
+        try:
+            yield batch
+        except BaseException:
+            batch.cancel()
+            raise
+        else:
+            batch.flush()
+        finally:
+            self._local.batch = previous
+
+    def _execute(self, request, transform=None):
+        """
+        Executes the request, returning its transformed result,
+        or a Future of it inside batch()
+        """
+        batch = getattr(self._local, "batch", None)
+        if batch is not None:
+            return batch.add(request, transform)
+        result = execute(request)
+        if transform is not None:
+            return transform(result)
+        return result
+
     # API ENDPOINTS
-    def add_enrichment(self, album_id: str, enrichement_type, position):
+    def add_enrichment(self,
+                       album_id: str,
+                       enrichement_type,
+                       position,
+                       transform=None):
         """ Generic. Use the specified versions """
         # To be used by the other enrichemnts methods
         request_body = {
             "newEnrichmentItem": enrichement_type,
             "albumPosition": position
         }
-        return self._service.albums().addEnrichment(
+        return self._execute(self._service.albums().addEnrichment(
             albumId=album_id,
-            body=request_body).execute()
+            body=request_body), transform)
 
     def add_location(
             self,
@@ -287,8 +451,8 @@ class Album:
                 "location": location
             }
         }
-        result = self.add_enrichment(album_id, enrichement_type, position)
-        return result.get("enrichmentItem")
+        return self.add_enrichment(
+            album_id, enrichement_type, position, _enrichment_item)
 
     def add_map(
             self,
@@ -336,8 +500,8 @@ class Album:
                 "destination": destination_loc
             }
         }
-        result = self.add_enrichment(album_id, enrichement_type, position)
-        return result.get("enrichmentItem")
+        return self.add_enrichment(
+            album_id, enrichement_type, position, _enrichment_item)
 
     def add_text(
             self,
@@ -371,58 +535,146 @@ class Album:
                 "text": text
             }
         }
-        result = self.add_enrichment(album_id, enrichement_type, position)
-        return result.get("enrichmentItem")
-
-    def batchAddMediaItems(self, album_id: str, items):
+        return self.add_enrichment(
+            album_id, enrichement_type, position, _enrichment_item)
+
+    def _batch_media_items(self,
+                           method: str,
+                           album_id: str,
+                           items,
+                           workers,
+                           raise_errors):
+        """ Sends the items in chunks, see batchAddMediaItems() """
+        albums = self._service.albums()
+        chunks = list(batches(list(items), MEDIA_ITEMS_LIMIT))
+
+        def send(chunk):
+            request_body = {
+                "mediaItemIds": chunk
+            }
+            return self._execute(getattr(albums, method)(
+                albumId=album_id,
+                body=request_body))
+
+        if getattr(self._local, "batch", None) is not None:
+            # Inside batch(): a Future per chunk
+            return [send(chunk) for chunk in chunks]
+
+        def report(chunk):
+            try:
+                return {"media_item_ids": chunk,
+                        "result": send(chunk),
+                        "error": None}
+            except Exception as e:
+                return {"media_item_ids": chunk,
+                        "result": None,
+                        "error": e}
+
+        with ContextThreadPoolExecutor(
+                max_workers=max(workers, 1)) as executor:
+            reports = list(executor.map(report, chunks))
+        errors = [r["error"] for r in reports if r["error"] is not None]
+        if errors and raise_errors:
+            raise BatchMediaItemsError(
+                "{} of {} chunks failed in {}".format(
+                    len(errors), len(reports), method),
+                reports) from errors[0]
+        return reports
+
+    def batchAddMediaItems(self,
+                           album_id: str,
+                           items,
+                           workers=4,
+                           raise_errors=True):
         """
         Add a list of media items to the given album
 
         The media items and the album must have been created
         by the developer via the API.
 
+        The items are sent in chunks of 50 (the API maximum),
+        up to workers chunks at the same time.
+
         Parameters
         ----------
         album_id: str
             Id of the album to add the items to
         items: [str]
             list of Ids of items to add to the album
+        workers: int, optional
+            Number of chunks sent concurrently (default 4)
+        raise_errors: bool, optional
+            If False the failed chunks are only reported, instead of
+            raising BatchMediaItemsError once all the chunks are sent
+            (default True)
 
         Returns
         -------
-        Empty object if successfull
-        """
-        request_body = {
-            "mediaItemIds": items
-        }
-        return self._service.albums().batchAddMediaItems(
-            albumId=album_id,
-            body=request_body).execute()
+        List of the reports of each chunk, in order: dicts with the
+        "media_item_ids" of the chunk, the "result" of the request
+        (empty object if successfull) and the "error" raised, or None.
+        Inside batch(), a list of Futures of the chunk results.
+        This used to be the empty object of the single request
+
+        Raise
+        -----
+        BatchMediaItemsError
+            If a chunk failed and raise_errors is True; its reports
+            attribute holds the reports of all the chunks, and the
+            error of the first failed chunk is its __cause__
+
+        Notes
+        -----
+        Chunks sent concurrently may be appended to the album
+        in any order: set workers=1 to keep the order of items.
 
-    def batchRemoveMediaItems(self, album_id: str, items):
+        Examples
+        --------
+        >>> reports = album_manager.batchAddMediaItems(
+        ...     album_id, ids, raise_errors=False)
+        >>> failed = [id for r in reports if r["error"] is not None
+        ...           for id in r["media_item_ids"]]
+        """
+        return self._batch_media_items(
+            "batchAddMediaItems", album_id, items, workers, raise_errors)
+
+    def batchRemoveMediaItems(self,
+                              album_id: str,
+                              items,
+                              workers=4,
+                              raise_errors=True):
         """
         Removes a list of media items to the given album
 
         The media items and the album must have been created
         by the developer via the API.
 
+        The items are sent in chunks of 50 (the API maximum),
+        up to workers chunks at the same time.
+
         Parameters
         ----------
         album_id: str
             Id of the album to add the items to
         items: [str]
             list of Ids of items to add to the album
+        workers: int, optional
+            Number of chunks sent concurrently (default 4)
+        raise_errors: bool, optional
+            If False the failed chunks are only reported (default True)
 
         Returns
         -------
-        Empty object if successfull
+        List of the reports of each chunk, as batchAddMediaItems()
+        (this used to be the empty object of the single request)
+
+        Raise
+        -----
+        BatchMediaItemsError
+            If a chunk failed and raise_errors is True
         """
-        request_body = {
-            "mediaItemIds": items
-        }
-        return self._service.albums().batchRemoveMediaItems(
-            albumId=album_id,
-            body=request_body).execute()
+        return self._batch_media_items(
+            "batchRemoveMediaItems", album_id, items, workers, raise_errors)
 
     def create(self, title: str):
         """
@@ -448,7 +700,7 @@ class Album:
         request_body = {
             "album": {'title': title}
         }
-        return self._service.albums().create(body=request_body).execute()
+        return self._execute(self._service.albums().create(body=request_body))
 
     def get(self, id: str):
         """
@@ -478,9 +730,13 @@ class Album:
 
         >>> album_manager.get(album_id)
         """
-        return self._service.albums().get(albumId=id).execute()
+        return self._execute(self._service.albums().get(albumId=id))
 
-    def list(self, show_only_created=_SHOW_ONLY_CREATED):
+    def list(self,
+             show_only_created=_SHOW_ONLY_CREATED,
+             prefetch=0,
+             resume_from=None,
+             fields=None):
         """
         Iterator over the albums present in the Google Photos account
 
@@ -489,10 +745,23 @@ class Album:
         show_only_created: bool, optional
             Set if it has to list only albums created via the API
             (default is set by show_only_created(), whose default is FALSE)
+        prefetch: int, optional
+            Number of pages to fetch ahead on a background thread,
+            while the current page is consumed (default 0, no prefetch)
+        resume_from: dict, optional
+            Checkpoint of a previous walk over the same list, as returned
+            by the checkpoint() method of the iterator: the walk continues
+            from the item following the checkpoint
+        fields: str or [str], optional
+            Fields of each album to be returned, in the partial response
+            format of the API, such as "id,title"
+            (default None, all the fields)
 
         Yields
         -------
-        An iterator over the list of albums
+        An iterator over the list of albums. The iterator has a
+        checkpoint() method returning a JSON-serializable position
+        of the walk
 
         Notes
         -----
@@ -521,17 +790,17 @@ class Album:
 
         >>> print(next(album_iterator))
         """
-        page_token = ""
-        while page_token is not None:
-            result = self._service.albums().list(
-                pageSize=self._PAGESIZE,
-                excludeNonAppCreatedData=show_only_created,
-                pageToken=page_token
-            ).execute()
-            page_token = result.get("nextPageToken", None)
-            curr_list = result.get("albums")
-            for album in curr_list:
-                yield album
+        query = {
+            "pageSize": self._PAGESIZE,
+            "excludeNonAppCreatedData": show_only_created
+        }
+
+        mask = fields_mask("albums", fields)
+
+        def fetch_page(page_token):
+            return execute(self._service.albums().list(
+                pageToken=page_token, fields=mask, **query))
+        return Paginator(fetch_page, "albums", prefetch, query, resume_from)
 
     def share(
             self,
@@ -584,10 +853,9 @@ class Album:
                 "isCommentable": commentable
             }
         }
-        result = self._service.albums().share(
+        return self._execute(self._service.albums().share(
             albumId=id,
-            body=request_body).execute()
-        return result.get('shareInfo')
+            body=request_body), _share_info)
 
     def unshare(self, id: str):
         """
@@ -624,4 +892,4 @@ class Album:
         >>> album_manager.unshare(id_album)
         {}
         """
-        return self._service.albums().unshare(albumId=id).execute()
+        return self._execute(self._service.albums().unshare(albumId=id))
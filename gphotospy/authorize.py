@@ -1,9 +1,11 @@
 import os
 import pickle
 import logging
+import threading
+from datetime import datetime, timedelta, timezone
 from google_auth_oauthlib.flow import Flow, InstalledAppFlow
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.http import MediaFileUpload, build_http
 from google.auth.transport.requests import Request
 
 
@@ -15,27 +17,163 @@ scopes_arr = [
     'https://www.googleapis.com/auth/photoslibrary.sharing'
 ]
 
+# Credentials are refreshed when they expire within this many seconds
+REFRESH_MARGIN = 300
 
-def get_credentials(secrets):
-    credentials = None
+
+def _token_path(secrets):
     secrets_dir = os.path.dirname(os.path.abspath(secrets))
-    token_path = os.path.join(secrets_dir, token_file)
+    return os.path.join(secrets_dir, token_file)
+
+
+def _needs_refresh(credentials):
+    if not credentials.valid:
+        return True
+    expiry = getattr(credentials, "expiry", None)
+    if expiry is None:
+        return False
+    # google-auth keeps the expiry as a naive UTC datetime
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return expiry - now < timedelta(seconds=REFRESH_MARGIN)
+
+
+class CredentialStore:
+    """
+    Process-wide, thread-safe store of the OAuth credentials.
+
+    The token file is read once per secrets file; the credentials are then
+    kept in memory and refreshed, under a lock, only when they are about
+    to expire. The token file is written only after a refresh.
+
+    Examples
+    --------
+    The store is shared by the service object, the managers and the
+    uploader; there is normally no need to use it directly
+
+    >>> from gphotospy.authorize import credential_store
+    >>> credentials = credential_store.get(CLIENT_SECRET_FILE)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._credentials = {}
+
+    def get(self, secrets):
+        """
+        Returns the credentials for the given secrets file,
+        loading or refreshing them if needed
+        """
+        token_path = _token_path(secrets)
+        credentials = self._credentials.get(token_path)
+        if credentials is not None and not _needs_refresh(credentials):
+            return credentials
+        with self._lock:
+            # Another thread may have done the work while we waited
+            credentials = self._credentials.get(token_path)
+            if credentials is None or _needs_refresh(credentials):
+                credentials = self._load(secrets, token_path, credentials)
+                self._credentials[token_path] = credentials
+            return credentials
+
+    def refresh(self, secrets, stale_token=None):
+        """
+        Forces a refresh of the credentials, for instance after the server
+        rejected them. If stale_token is given and the credentials hold
+        already a different token, they are not refreshed again.
+        """
+        token_path = _token_path(secrets)
+        with self._lock:
+            credentials = self._credentials.get(token_path)
+            if credentials is None:
+                credentials = self._load(secrets, token_path)
+                self._credentials[token_path] = credentials
+            elif stale_token is None or credentials.token == stale_token:
+                credentials.refresh(Request())
+                self._save(credentials, token_path)
+            return credentials
+
+    def clear(self):
+        """ Forgets all the credentials held in memory """
+        with self._lock:
+            self._credentials.clear()
 
-    if os.path.exists(token_path):
-        with open(token_path, 'rb') as token:
-            credentials = pickle.load(token)
+    def _load(self, secrets, token_path, credentials=None):
+        if credentials is None and os.path.exists(token_path):
+            with open(token_path, 'rb') as token:
+                credentials = pickle.load(token)
+            logging.debug('credentials loaded from {}'.format(token_path))
 
-    if not credentials or not credentials.valid:
-        if credentials and credentials.expired and credentials.refresh_token:
-            credentials.refresh(Request())
-        else:
-            app_flow = InstalledAppFlow.from_client_secrets_file(
-                secrets, scopes_arr)
-            credentials = app_flow.run_local_server()
+        if not credentials or _needs_refresh(credentials):
+            if credentials and credentials.refresh_token:
+                credentials.refresh(Request())
+            else:
+                app_flow = InstalledAppFlow.from_client_secrets_file(
+                    secrets, scopes_arr)
+                credentials = app_flow.run_local_server()
+            self._save(credentials, token_path)
+        return credentials
 
+    def _save(self, credentials, token_path):
         with open(token_path, 'wb') as token:
             pickle.dump(credentials, token)
-    return credentials
+
+
+credential_store = CredentialStore()
+
+
+def get_credentials(secrets):
+    return credential_store.get(secrets)
+
+
+class CredentialHttp:
+    """
+    Transport of the service object, authorizing every request with the
+    credentials of the credential store.
+
+    httplib2.Http objects are not thread-safe, so one is kept per thread,
+    built as googleapiclient does: with a socket timeout (60 seconds by
+    default) and without following the 308 of resumable media.
+    """
+
+    def __init__(self, secrets, store=None, timeout=None):
+        self._secrets = secrets
+        self._store = store if store is not None else credential_store
+        self._local = threading.local()
+        self.timeout = timeout
+
+    @property
+    def credentials(self):
+        return self._store.get(self._secrets)
+
+    def _http(self):
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = build_http()
+            if self.timeout is not None:
+                http.timeout = self.timeout
+            self._local.http = http
+        return http
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        credentials = self._store.get(self._secrets)
+        auth_headers = dict(headers or {})
+        credentials.apply(auth_headers)
+        resp, content = self._http().request(
+            uri, method, body=body, headers=auth_headers, **kwargs)
+        if resp.status == 401:
+            # Token revoked or expired early: refresh once and retry
+            credentials = self._store.refresh(
+                self._secrets, credentials.token)
+            auth_headers = dict(headers or {})
+            credentials.apply(auth_headers)
+            resp, content = self._http().request(
+                uri, method, body=body, headers=auth_headers, **kwargs)
+        return resp, content
+
+    def close(self):
+        http = getattr(self._local, "http", None)
+        if http is not None:
+            http.close()
 
 
 def init(secrets):
@@ -52,12 +190,14 @@ def init(secrets):
     -------
     A service object to pass to the Media, Album, or SharedAlbum contructors
     """
-    credentials = get_credentials(secrets)
+    # Authorize now, so the browser flow does not start mid-request
+    get_credentials(secrets)
     service_object = {
         "secrets": secrets
     }
     try:
-        service = build(service_name, version,  static_discovery=False, credentials=credentials)
+        service = build(service_name, version, static_discovery=False,
+                        http=CredentialHttp(secrets))
         logging.debug('service created successfully: {}'.format(service_name))
         service_object["service"] = service
         return service_object
@@ -0,0 +1,128 @@
+from array import array
+
+from .utils import epoch_seconds
+
+try:
+    import numpy
+except ImportError:  # numpy is an optional dependency
+    numpy = None
+
+# Codes of the mime_category column
+MIME_CATEGORIES = ("", "image", "video")
+
+# Partial response mask asking only the fields stored in the columns
+COLUMN_FIELDS = ("id,mimeType,mediaMetadata(creationTime,width,height,"
+                 "photo(cameraMake,cameraModel),"
+                 "video(cameraMake,cameraModel,fps))")
+
+
+class Columns:
+    """
+    Columnar buffers of the library metadata, one entry per media.
+
+    Numeric columns are array.array buffers: creation_time (int64
+    seconds since the epoch, UTC), width and height (int64), fps
+    (float64, 0 for photos) and mime_category (int8 codes, the index
+    in MIME_CATEGORIES). String columns (id, camera_make, camera_model)
+    are lists.
+
+    to_numpy() returns the same columns as NumPy arrays, for vectorized
+    aggregations. NumPy is needed only by to_numpy().
+
+    Examples
+    --------
+    Imports
+
+    >>> from gphotospy.columns import Columns, MIME_CATEGORIES
+
+    Build the columns of the whole library
+
+    >>> columns = media_manager.to_columns()
+    >>> len(columns)
+    12345
+
+    Videos per camera model, without NumPy
+
+    >>> video = MIME_CATEGORIES.index("video")
+    >>> collections.Counter(
+    ...     model for model, category
+    ...     in zip(columns.camera_model, columns.mime_category)
+    ...     if category == video)
+
+    Resolution histogram, with NumPy
+
+    >>> arrays = media_manager.to_numpy()
+    >>> numpy.histogram(arrays["width"] * arrays["height"], bins=10)
+    """
+
+    def __init__(self):
+        """ Constructor: empty columns """
+        self.id = []
+        self.creation_time = array("q")
+        self.width = array("q")
+        self.height = array("q")
+        self.fps = array("d")
+        self.mime_category = array("b")
+        self.camera_make = []
+        self.camera_model = []
+
+    def __len__(self):
+        return len(self.id)
+
+    def append(self, media_object):
+        """ Appends a media dict, as returned by the API """
+        metadata = media_object.get("mediaMetadata", {})
+        details = metadata.get("photo") or metadata.get("video") or {}
+        category = media_object.get("mimeType", "").split("/")[0]
+        if category not in MIME_CATEGORIES:
+            category = ""
+        self.id.append(media_object.get("id", ""))
+        self.creation_time.append(
+            epoch_seconds(metadata.get("creationTime")))
+        self.width.append(int(metadata.get("width", 0)))
+        self.height.append(int(metadata.get("height", 0)))
+        self.fps.append(float(details.get("fps", 0)))
+        self.mime_category.append(MIME_CATEGORIES.index(category))
+        self.camera_make.append(details.get("cameraMake", ""))
+        self.camera_model.append(details.get("cameraModel", ""))
+
+    def extend(self, media_iterator):
+        """ Appends all the media dicts of the iterator """
+        for media_object in media_iterator:
+            self.append(media_object)
+        return self
+
+    def as_dict(self):
+        """ Returns the columns as a dict name -> buffer """
+        return {
+            "id": self.id,
+            "creation_time": self.creation_time,
+            "width": self.width,
+            "height": self.height,
+            "fps": self.fps,
+            "mime_category": self.mime_category,
+            "camera_make": self.camera_make,
+            "camera_model": self.camera_model
+        }
+
+    def to_numpy(self):
+        """
+        Returns the columns as a dict name -> NumPy array.
+        Numeric buffers are copied as a whole, not item by item.
+
+        Raise
+        -----
+        ImportError
+            If NumPy is not installed
+        """
+        if numpy is None:
+            raise ImportError(
+                "to_numpy() requires NumPy: pip install gphotospy[numpy]")
+        arrays = {}
+        for name, column in self.as_dict().items():
+            if isinstance(column, array):
+                arrays[name] = numpy.frombuffer(
+                    column, dtype=column.typecode).copy()
+            else:
+                arrays[name] = numpy.array(column, dtype=object)
+        return arrays
@@ -0,0 +1,199 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Bytes read at a time when hashing a file
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_hash(path):
+    """
+    Returns the SHA-256 hex digest of a file,
+    streaming it from disk in blocks of HASH_BLOCK_SIZE
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class UploadIndex:
+    """
+    Local index of the uploaded files, kept in a SQLite database.
+
+    Files are identified by the hash of their content, so a file that
+    was already uploaded is recognized even if moved or renamed.
+    The hash of each path is cached together with its size and
+    modification time, so unchanged files are not hashed again.
+    A content being uploaded is claimed by its file (see claim()), so
+    that files with the same content in the same run are uploaded once.
+
+    Examples
+    --------
+    Imports
+
+    >>> from gphotospy.dedup import UploadIndex
+
+    Skip files already uploaded by a previous run
+
+    >>> media_manager.set_upload_index(UploadIndex('uploads.db'))
+    >>> media_manager.stage_many(files, workers=8)
+    >>> media_manager.batchCreate()
+    """
+
+    def __init__(self, path):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        path: Path
+            SQLite database file, created if it does not exist
+        """
+        self._lock = threading.Lock()
+        # Hash -> path of the file uploading it, in this process
+        self._claims = {}
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime REAL, hash TEXT)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS uploads ("
+                "hash TEXT PRIMARY KEY, size INTEGER, upload_token TEXT, "
+                "media_item_id TEXT, uploaded_at REAL)")
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS uploads_token "
+                "ON uploads (upload_token)")
+
+    def close(self):
+        """ Closes the database """
+        with self._lock:
+            self._db.close()
+
+    def hash(self, media_file):
+        """
+        Returns the content hash of the file, computing it only
+        if the file changed size or modification time since last seen
+        """
+        path = os.path.abspath(media_file)
+        stat = os.stat(path)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT size, mtime, hash FROM files WHERE path = ?",
+                (path,)).fetchone()
+        if row is not None and row[0] == stat.st_size \
+                and row[1] == stat.st_mtime:
+            return row[2]
+        # Hash outside the lock: hashlib releases the GIL on big blocks,
+        # so many files are hashed in parallel
+        digest = file_hash(path)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime, digest))
+        return digest
+
+    def hash_many(self, media_files, workers=4):
+        """
+        Hashes many files in parallel
+
+        Parameters
+        ----------
+        media_files: [Path]
+            Files to hash
+        workers: int, optional
+            Number of hashing threads (default 4)
+
+        Returns
+        -------
+        dict:
+            The hash of each file, keyed by its path as given
+        """
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            return dict(zip(media_files, executor.map(self.hash, media_files)))
+
+    def lookup(self, media_file):
+        """
+        Returns the upload recorded for a file with the same content
+
+        Returns
+        -------
+        dict:
+            with the keys "hash", "upload_token" and "media_item_id";
+            the last two are None if the content was never uploaded,
+            or never created in the library
+        """
+        digest = self.hash(media_file)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT upload_token, media_item_id FROM uploads "
+                "WHERE hash = ?", (digest,)).fetchone()
+        if row is None:
+            row = (None, None)
+        return {
+            "hash": digest,
+            "upload_token": row[0],
+            "media_item_id": row[1]
+        }
+
+    def is_uploaded(self, media_file):
+        """ True if a file with the same content is already in the library """
+        return self.lookup(media_file)["media_item_id"] is not None
+
+    def claim(self, media_file):
+        """
+        Claims the upload of the content of the file. Returns False if
+        the same content is already in the library, or claimed by
+        another file (being uploaded, or uploaded and not yet created,
+        in this process): the file is then to be skipped
+        """
+        path = os.path.abspath(media_file)
+        digest = self.hash(path)
+        with self._lock:
+            owner = self._claims.get(digest)
+            if owner is not None:
+                return owner == path
+            row = self._db.execute(
+                "SELECT media_item_id FROM uploads WHERE hash = ?",
+                (digest,)).fetchone()
+            if row is not None and row[0] is not None:
+                return False
+            self._claims[digest] = path
+            return True
+
+    def release(self, media_file):
+        """ Drops the claim of the file, whose upload failed """
+        path = os.path.abspath(media_file)
+        digest = self.hash(path)
+        with self._lock:
+            if self._claims.get(digest) == path:
+                del self._claims[digest]
+
+    def is_created(self, upload_token):
+        """ True if the upload token was already used to create a media """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT media_item_id FROM uploads WHERE upload_token = ?",
+                (upload_token,)).fetchone()
+        return row is not None and row[0] is not None
+
+    def record_upload(self, media_file, upload_token):
+        """ Records the upload token obtained uploading the file """
+        digest = self.hash(media_file)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, NULL, ?)",
+                (digest, os.path.getsize(media_file), upload_token,
+                 time.time()))
+
+    def record_created(self, upload_token, media_item_id):
+        """ Records the media item created from the upload token """
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE uploads SET media_item_id = ? WHERE upload_token = ?",
+                (media_item_id, upload_token))
@@ -0,0 +1,243 @@
+import time
+import random
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+
+import httplib2
+
+from . import quota, ratelimit
+
+# Retries of a request, after the first attempt
+MAX_RETRIES = 5
+# Seconds of the first backoff, doubled at each retry
+BACKOFF = 1.0
+# Maximum seconds of a backoff (and of a Retry-After honored)
+MAX_BACKOFF = 60.0
+# Retries available at once to all the requests, see RequestExecutor
+RETRY_BUDGET = 100
+# Retries earned by each request, up to RETRY_BUDGET
+RETRY_RATIO = 0.1
+
+# HTTP statuses retried for idempotent requests
+RETRY_STATUS = (408, 429, 500, 502, 503, 504)
+# HTTP statuses retried for non-idempotent requests: the server
+# refused the request, so it was not processed
+SAFE_RETRY_STATUS = (429,)
+
+# POST methods which can be sent twice with the same effect
+IDEMPOTENT_METHODS = (
+    "photoslibrary.mediaItems.search",
+    "photoslibrary.albums.batchAddMediaItems",
+    "photoslibrary.albums.batchRemoveMediaItems",
+    "photoslibrary.albums.share",
+    "photoslibrary.albums.unshare",
+    "photoslibrary.sharedAlbums.join",
+    "photoslibrary.sharedAlbums.leave",
+)
+
+
+def http_status(error):
+    """ HTTP status of an HttpError, or None for other errors """
+    status = getattr(getattr(error, "resp", None), "status", None)
+    return None if status is None else int(status)
+
+
+def is_idempotent(request):
+    """
+    True if the request can be sent again without side effects:
+    GET requests, and the POST methods in IDEMPOTENT_METHODS
+    """
+    if getattr(request, "method", "GET") == "GET":
+        return True
+    return getattr(request, "methodId", None) in IDEMPOTENT_METHODS
+
+
+def is_retryable(error, idempotent):
+    """
+    True if a request failed with error can be retried. Failures that
+    may have reached the server (connection errors, 5xx) are retried
+    only for idempotent requests
+    """
+    status = http_status(error)
+    if status is not None:
+        return status in (RETRY_STATUS if idempotent else SAFE_RETRY_STATUS)
+    return idempotent and isinstance(
+        error, (OSError, httplib2.HttpLib2Error))
+
+
+def _retry_after(error):
+    """ Seconds asked by the Retry-After header of error, or None """
+    resp = getattr(error, "resp", None)
+    return retry_after(resp.get("retry-after") if resp is not None else None)
+
+
+def retry_after(value):
+    """
+    Seconds asked by a Retry-After header value (seconds or HTTP date),
+    or None
+    """
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(),
+                   0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestExecutor:
+    """
+    Executes the API requests, retrying the failed ones with
+    exponential backoff and full jitter.
+
+    Only idempotent requests are retried after a failure which may
+    have reached the server; all of them are retried after a 429.
+    A Retry-After header sent by the server replaces the backoff.
+
+    The retries come from a shared budget: each request earns ratio
+    retries, up to budget, and each retry spends one. When a burst of
+    failures exhausts the budget, the requests fail without retrying,
+    instead of piling up on a server in trouble.
+
+    Examples
+    --------
+    Imports
+
+    >>> from gphotospy import executor
+
+    More patient retries for a long walk
+
+    >>> executor.configure(max_retries=8, max_backoff=120)
+    >>> for media in media_manager.list():
+    ...     process(media)
+    """
+
+    def __init__(self,
+                 max_retries=MAX_RETRIES,
+                 backoff=BACKOFF,
+                 max_backoff=MAX_BACKOFF,
+                 budget=RETRY_BUDGET,
+                 ratio=RETRY_RATIO):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        max_retries: int, optional
+            Retries of a request, after the first attempt (default 5)
+        backoff: float, optional
+            Seconds of the first backoff, doubled at each retry
+            (default 1.0)
+        max_backoff: float, optional
+            Maximum seconds waited before a retry (default 60)
+        budget: float, optional
+            Maximum retries available at once (default 100),
+            None for no budget
+        ratio: float, optional
+            Retries earned by each request (default 0.1)
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.budget = budget
+        self.ratio = ratio
+        self._tokens = budget
+        self._lock = threading.Lock()
+
+    def remaining_budget(self):
+        """ Retries currently available, None if there is no budget """
+        return self._tokens
+
+    def _earn(self):
+        if self.budget is None:
+            return
+        with self._lock:
+            self._tokens = min(self._tokens + self.ratio, self.budget)
+
+    def _spend(self):
+        if self.budget is None:
+            return True
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def delay(self, error, attempt):
+        """ Seconds to wait before the retry number attempt (from 0) """
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+        return random.uniform(
+            0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def execute(self, request, idempotent=None, cost=1):
+        """
+        Executes the request, retrying it if it fails and it can be
+        retried (see is_retryable()); returns its result.
+
+        Parameters
+        ----------
+        request: HttpRequest
+            The googleapiclient request, or anything with an execute()
+        idempotent: bool, optional
+            Whether the request can be sent twice, by default
+            guessed by is_idempotent()
+        cost: int, optional
+            Requests counted against the daily quota at each attempt,
+            e.g. the calls in a batch HTTP request (default 1)
+        """
+        if idempotent is None:
+            idempotent = is_idempotent(request)
+        self._earn()
+        attempt = 0
+        while True:
+            # Every attempt counts against the daily quota
+            quota.charge(quota.API, cost)
+            ratelimit.throttle(quota.API, cost)
+            try:
+                return request.execute()
+            except Exception as e:
+                if attempt >= self.max_retries \
+                        or not is_retryable(e, idempotent) \
+                        or not self._spend():
+                    raise
+                delay = self.delay(e, attempt)
+                logging.warning(
+                    "%s failed (%s), retry %d in %.1f s",
+                    getattr(request, "methodId", "request"), e,
+                    attempt + 1, delay)
+                time.sleep(delay)
+                attempt += 1
+
+
+_executor = RequestExecutor()
+
+
+def configure(max_retries=MAX_RETRIES,
+              backoff=BACKOFF,
+              max_backoff=MAX_BACKOFF,
+              budget=RETRY_BUDGET,
+              ratio=RETRY_RATIO):
+    """
+    Configures the executor shared by all the managers
+    (see RequestExecutor for the parameters)
+    """
+    global _executor
+    _executor = RequestExecutor(max_retries, backoff, max_backoff,
+                                budget, ratio)
+
+
+def get_executor():
+    """ Returns the executor shared by all the managers """
+    return _executor
+
+
+def execute(request, idempotent=None, cost=1):
+    """ Executes the request through the shared executor """
+    return _executor.execute(request, idempotent, cost)
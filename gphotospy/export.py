@@ -0,0 +1,217 @@
+import csv
+import gzip
+import json
+import time
+import os.path
+
+# Default CSV columns, as paths in the nested dicts
+MEDIA_COLUMNS = ("id", "filename", "mimeType", "mediaMetadata/creationTime",
+                 "mediaMetadata/width", "mediaMetadata/height",
+                 "productUrl")
+ALBUM_COLUMNS = ("id", "title", "mediaItemsCount", "coverPhotoMediaItemId",
+                 "isWriteable", "productUrl")
+
+
+def _flatten(item, prefix=""):
+    """ Flattens nested dicts into a dict path -> value """
+    flat = {}
+    for key, value in item.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, prefix + key + "/"))
+        else:
+            flat[prefix + key] = value
+    return flat
+
+
+def _as_dict(item):
+    """ Media dicts as they are, MediaRecord objects as dicts """
+    if isinstance(item, dict):
+        return item
+    return {name: getattr(item, name) for name in item.__slots__}
+
+
+def _record_row(record):
+    """
+    CSV row of a MediaRecord, under the paths of the media dict, so that
+    records and dicts give the same columns (fractional seconds of the
+    creation time are lost)
+    """
+    row = {"id": record.id,
+           "filename": record.filename,
+           "mimeType": record.mime_type}
+    if record.creation_time:
+        row["mediaMetadata/creationTime"] = time.strftime(
+            "%Y-%m-%dT%H:%M:%SZ", time.gmtime(record.creation_time))
+    if record.width:
+        row["mediaMetadata/width"] = str(record.width)
+    if record.height:
+        row["mediaMetadata/height"] = str(record.height)
+    return row
+
+
+class Exporter:
+    """
+    Streaming writer of media or albums to NDJSON or CSV files,
+    optionally gzip-compressed, with rotation of the output files.
+
+    Items are written as they come, so that the memory stays flat
+    whatever the size of the library.
+
+    The format is given by the extension of path: ".csv" for CSV,
+    anything else for NDJSON (one JSON object per line); a further
+    ".gz" compresses the files.
+
+    When rotating, the files are numbered before the (last) extension:
+    "media.ndjson.gz" becomes "media-00001.ndjson.gz",
+    "media-00002.ndjson.gz", ... and "library.2024.csv" becomes
+    "library.2024-00001.csv", ...
+
+    Examples
+    --------
+    Imports
+
+    >>> from gphotospy.export import Exporter, export, ALBUM_COLUMNS
+
+    Export the whole library, in files of 100000 media each
+
+    >>> export(media_manager.list(prefetch=2), 'media.ndjson.gz',
+    ...        max_rows=100000)
+    ['media-00001.ndjson.gz', 'media-00002.ndjson.gz']
+
+    Export the albums to CSV
+
+    >>> export(album_manager.list(), 'albums.csv', columns=ALBUM_COLUMNS)
+    ['albums.csv']
+
+    Write items as they are processed
+
+    >>> with Exporter('videos.ndjson') as exporter:
+    ...     for media in media_manager.search(MEDIAFILTER.VIDEO):
+    ...         exporter.write(media)
+    """
+
+    def __init__(self,
+                 path,
+                 columns=None,
+                 max_rows=None,
+                 max_bytes=None):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        path: Path
+            Output file; the extension sets the format (see above)
+        columns: [str], optional
+            CSV columns, as paths in the nested dicts such as
+            "mediaMetadata/creationTime" (default MEDIA_COLUMNS).
+            Ignored for NDJSON
+        max_rows: int, optional
+            Rotates the file after max_rows items (default None, never)
+        max_bytes: int, optional
+            Rotates the file once max_bytes (uncompressed) are written
+            (default None, never)
+        """
+        self._path = str(path)
+        name = self._path[:-3] if self._path.endswith(".gz") else self._path
+        self._compress = name != self._path
+        self._csv = name.endswith(".csv")
+        self._columns = list(columns or MEDIA_COLUMNS)
+        self._max_rows = max_rows
+        self._max_bytes = max_bytes
+        self._rotate = max_rows is not None or max_bytes is not None
+        self._file = None
+        self._writer = None
+        self._rows = 0
+        self._bytes = 0
+        self.files = []
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _next_path(self):
+        if not self._rotate:
+            return self._path
+        gz = ".gz" if self._compress else ""
+        base, extension = os.path.splitext(self._path[:len(self._path)
+                                                      - len(gz)])
+        return "{}-{:05d}{}{}".format(
+            base, len(self.files) + 1, extension, gz)
+
+    def _open(self):
+        path = self._next_path()
+        if self._compress:
+            self._file = gzip.open(path, "wt", encoding="utf-8", newline="")
+        else:
+            self._file = open(path, "w", encoding="utf-8", newline="")
+        self.files.append(path)
+        self._rows = 0
+        self._bytes = 0
+        if self._csv:
+            self._writer = csv.DictWriter(
+                self._file, self._columns, extrasaction="ignore")
+            self._writer.writeheader()
+
+    def _full(self):
+        return ((self._max_rows is not None
+                 and self._rows >= self._max_rows)
+                or (self._max_bytes is not None
+                    and self._bytes >= self._max_bytes))
+
+    def write(self, item):
+        """ Writes a media or album dict (or a MediaRecord) """
+        if self._file is not None and self._full():
+            self._file.close()
+            self._file = None
+        if self._file is None:
+            self._open()
+        if self._csv:
+            row = (_flatten(item) if isinstance(item, dict)
+                   else _record_row(item))
+            self._writer.writerow(row)
+            # Approximate size, enough for rotation
+            self._bytes += sum(len(str(row.get(c, "")))
+                               for c in self._columns) + len(self._columns)
+        else:
+            line = json.dumps(_as_dict(item)) + "\n"
+            self._file.write(line)
+            self._bytes += len(line)
+        self._rows += 1
+        self.count += 1
+
+    def write_all(self, iterator):
+        """ Writes all the items of the iterator, returns their number """
+        written = 0
+        for item in iterator:
+            self.write(item)
+            written += 1
+        return written
+
+    def close(self):
+        """ Closes the current file (creating it empty if nothing
+        was written, so that an export always has a file) """
+        if not self.files:
+            self._open()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def export(iterator, path, columns=None, max_rows=None, max_bytes=None):
+    """
+    Writes all the items of iterator (e.g. Media.list(), Media.search(),
+    Album.list(), SharedAlbum.list()) to path, streaming them.
+    See Exporter for the parameters.
+
+    Returns
+    -------
+    [str]:
+        Paths of the files written
+    """
+    with Exporter(path, columns, max_rows, max_bytes) as exporter:
+        exporter.write_all(iterator)
+    return exporter.files
@@ -0,0 +1,137 @@
+import time
+import sqlite3
+import threading
+
+# Upload tokens are valid for about a day: keep a safety margin
+TOKEN_LIFETIME = 23 * 60 * 60
+
+
+class UploadJournal:
+    """
+    On-disk journal of the upload tokens waiting for batchCreate,
+    kept in a SQLite database.
+
+    Every uploaded media is written to the journal, and marked once
+    created: if the process dies before batchCreate, a new Media manager
+    recovers the pending tokens and creates the media without uploading
+    them again.
+
+    Notes
+    -----
+    If the process dies after the server created the media, but before
+    the journal is updated, the media of that last batch may be created
+    twice on recovery.
+
+    Examples
+    --------
+    Imports
+
+    >>> from gphotospy.journal import UploadJournal
+
+    Journal the staged media
+
+    >>> journal = UploadJournal('pending.db')
+    >>> media_manager.set_journal(journal)
+    >>> media_manager.stage_many(files)
+
+    After a crash, in a new process
+
+    >>> media_manager.set_journal(UploadJournal('pending.db'))
+    >>> media_manager.recover()
+    >>> media_manager.batchCreate()
+    """
+
+    def __init__(self, path):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        path: Path
+            SQLite database file, created if it does not exist
+        """
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS tokens ("
+                "upload_token TEXT PRIMARY KEY, file_name TEXT, "
+                "description TEXT, media_file TEXT, staged_at REAL, "
+                "media_item_id TEXT, created_at REAL)")
+
+    def close(self):
+        """ Closes the database """
+        with self._lock:
+            self._db.close()
+
+    def add(self, upload_object, media_file=None):
+        """
+        Records a new upload object, as returned by
+        Media.get_upload_object(), as pending
+        """
+        item = upload_object["simpleMediaItem"]
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR IGNORE INTO tokens VALUES "
+                "(?, ?, ?, ?, ?, NULL, NULL)",
+                (item["uploadToken"], item.get("fileName", ""),
+                 upload_object.get("description", ""), media_file,
+                 time.time()))
+
+    def mark_created(self, upload_token, media_item_id):
+        """ Marks the upload token as used to create the given media """
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE tokens SET media_item_id = ?, created_at = ? "
+                "WHERE upload_token = ?",
+                (media_item_id, time.time(), upload_token))
+
+    def is_created(self, upload_token):
+        """ True if the upload token was already used to create a media """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT media_item_id FROM tokens WHERE upload_token = ?",
+                (upload_token,)).fetchone()
+        return row is not None and row[0] is not None
+
+    def pending(self, max_age=TOKEN_LIFETIME):
+        """
+        Returns the upload objects not yet created,
+        whose token is younger than max_age seconds, oldest first
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT upload_token, file_name, description FROM tokens "
+                "WHERE media_item_id IS NULL AND staged_at > ? "
+                "ORDER BY staged_at",
+                (time.time() - max_age,)).fetchall()
+        return [{
+            "description": description,
+            "simpleMediaItem": {
+                "uploadToken": upload_token,
+                "fileName": file_name
+            }
+        } for upload_token, file_name, description in rows]
+
+    def expired(self, max_age=TOKEN_LIFETIME):
+        """
+        Returns the paths of the files uploaded but never created, whose
+        token expired: they must be uploaded again
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT media_file FROM tokens "
+                "WHERE media_item_id IS NULL AND staged_at <= ?",
+                (time.time() - max_age,)).fetchall()
+        return [row[0] for row in rows]
+
+    def purge(self, max_age=TOKEN_LIFETIME):
+        """
+        Removes the expired tokens, created or not.
+        Created tokens are kept until they expire, so that they are
+        still recognized if submitted again.
+        """
+        with self._lock, self._db:
+            self._db.execute(
+                "DELETE FROM tokens WHERE staged_at <= ?",
+                (time.time() - max_age,))
@@ -1,13 +1,34 @@
 import itertools
 import os.path
 import json
-from urllib.request import urlopen
-
-from gphotospy.utils import batches
-
+import time
+import threading
+import datetime
+import contextvars
+from collections import deque
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+
+from gphotospy.utils import (batches, epoch_seconds, fields_mask,
+                             ContextThreadPoolExecutor, Paginator)
+
+from . import adaptive, quota, transport
+from .executor import execute, is_retryable
+from .columns import Columns, COLUMN_FIELDS
+from .query import Predicate, Or, And, all_of, where
 from .album import set_position, POSITION
 from .upload import upload
 
+# Retry rounds of the media whose creation failed for transient reasons
+CREATE_RETRIES = 3
+# Seconds before the first retry round, doubled at each round
+CREATE_BACKOFF = 1.0
+# Status codes of the transient failures: DEADLINE_EXCEEDED,
+# RESOURCE_EXHAUSTED, ABORTED, INTERNAL, UNAVAILABLE
+TRANSIENT_STATUS = (4, 8, 10, 13, 14)
+# Uploads of stage_and_create() finished ahead of a slower one
+# before it, buffered before the uploading pauses
+PIPELINE_BUFFER = 100
+
 
 class Val:
     """ Internal use only """
@@ -26,6 +47,7 @@ class MediaItem(Val):
     def __init__(self, media_object):
         """ MediaItem Constructor """
         super().__init__(media_object, 'MEDIAITEM')
+        self._dimensions = None
 
     def __str__(self):
         """ Used for print() """
@@ -52,9 +74,11 @@ class MediaItem(Val):
         >>> media.get_media_dimesions(media_id)
         (720, 200)
         """
-        metadata = self.val.get("mediaMetadata")
-        width = int(metadata.get("width"))
-        height = int(metadata.get("height"))
+        if self._dimensions is None:
+            metadata = self.val.get("mediaMetadata")
+            self._dimensions = (int(metadata.get("width")),
+                                int(metadata.get("height")))
+        width, height = self._dimensions
         if max_width != 0:
             if width > max_width:
                 width = max_width
@@ -149,8 +173,10 @@ class MediaItem(Val):
         Returns
         -------
         File object data.
-            Internally it applies a `read()` to the `rullib.urlopen`
-            on the media address
+            The media is fetched through the connection pool
+            shared with the uploads (see transport.configure())
+            The number of concurrent downloads adapts to the server,
+            if enabled with adaptive.enable()
 
         Raise
         -----
@@ -167,7 +193,140 @@ class MediaItem(Val):
         >>> with open(media.filename(), 'wb') as output:
         >>> ...    output.write(media.raw_download())
         """
-        return urlopen(self.get_url()).read()
+        with adaptive.slot(adaptive.DOWNLOAD) as transfer:
+            response = transport.get(self.get_url())
+            transfer.size = len(response.content)
+        response.raise_for_status()
+        return response.content
+
+
+class MediaRecord:
+    """
+    Compact record of a media item, with the creation time
+    and the dimensions already parsed.
+
+    A record takes a fraction of the memory of the media dict returned
+    by the API, for holding large numbers of media (e.g. for dedup).
+    Yielded by list(), search() and search_album() with as_records=True.
+
+    Attributes
+    ----------
+    id: str
+    filename: str
+    mime_type: str
+    creation_time: int
+        Seconds since the epoch (UTC), 0 if unknown
+    width: int
+    height: int
+    kind: str
+        "photo", "video" or "" if unknown
+
+    A record has no base URL: the one of the media dict expires after
+    about an hour, while records are held for longer (and served by
+    the mirror). Get the media again (see get()) to download it.
+    """
+
+    __slots__ = ("id", "filename", "mime_type", "creation_time",
+                 "width", "height", "kind")
+
+    def __init__(self,
+                 id,
+                 filename="",
+                 mime_type="",
+                 creation_time=0,
+                 width=0,
+                 height=0,
+                 kind=""):
+        """ MediaRecord Constructor """
+        self.id = id
+        self.filename = filename
+        self.mime_type = mime_type
+        self.creation_time = creation_time
+        self.width = width
+        self.height = height
+        self.kind = kind
+
+    @classmethod
+    def from_api(cls, media_object):
+        """
+        Builds the record of a media dict, as returned by the API.
+        Fields missing (e.g. because of a fields mask) get the defaults.
+        """
+        metadata = media_object.get("mediaMetadata", {})
+        if "photo" in metadata:
+            kind = "photo"
+        elif "video" in metadata:
+            kind = "video"
+        else:
+            kind = ""
+        return cls(
+            media_object.get("id", ""),
+            media_object.get("filename", ""),
+            media_object.get("mimeType", ""),
+            epoch_seconds(metadata.get("creationTime")),
+            int(metadata.get("width", 0)),
+            int(metadata.get("height", 0)),
+            kind)
+
+    def __repr__(self):
+        return "MediaRecord({})".format(", ".join(
+            "{}={!r}".format(name, getattr(self, name))
+            for name in self.__slots__))
+
+    def __eq__(self, other):
+        if not isinstance(other, MediaRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name)
+                   for name in self.__slots__)
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def dimensions(self):
+        """ Gets media (width, height) tuple """
+        return (self.width, self.height)
+
+    def is_photo(self):
+        """ Returns True if the media item is a photo """
+        return self.kind == "photo"
+
+    def is_video(self):
+        """ Returns True if the media item is a video """
+        return self.kind == "video"
+
+
+def _api_date(day):
+    return {"year": day.year, "month": day.month, "day": day.day}
+
+
+def _creation_day(media):
+    """ Day (UTC) of the creationTime of a media dict, None if missing """
+    creation_time = media.get("mediaMetadata", {}).get("creationTime")
+    if not creation_time:
+        return None
+    return datetime.date.fromisoformat(creation_time[:10])
+
+
+def _with_field(fields, field):
+    """ fields (str or list, as in list()) including field """
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    fields = list(fields)
+    if field not in fields:
+        fields.append(field)
+    return fields
+
+
+def _split_days(first, last, n):
+    """ Splits the days from first to last in up to n contiguous ranges """
+    days = (last - first).days + 1
+    n = max(min(n, days), 1)
+    ranges = []
+    for i in range(n):
+        a = first + datetime.timedelta(days=days * i // n)
+        b = first + datetime.timedelta(days=days * (i + 1) // n - 1)
+        ranges.append((a, b))
+    return ranges
 
 
 class MediaError(Exception):
@@ -185,6 +344,295 @@ class UnknownMediaType(MediaError):
     pass
 
 
+class _GetCoalescer:
+    """
+    Merges the ids asked by concurrent get() calls within a time window
+    in a single batch_get_chunk(ids) call, made in the context (e.g. the
+    quota priority) of the caller with the highest priority
+    """
+
+    def __init__(self, batch_get_chunk, window, max_batch=50):
+        self._batch_get_chunk = batch_get_chunk
+        self._window = window
+        self._max_batch = max_batch
+        self._lock = threading.Lock()
+        self._waiting = {}
+        self._timer = None
+        self._context = None
+        self._priority = None
+
+    def get(self, id):
+        future = Future()
+        priority = quota.current_priority()
+        with self._lock:
+            self._waiting.setdefault(id, []).append(future)
+            if self._priority is None or priority < self._priority:
+                self._priority = priority
+                self._context = contextvars.copy_context()
+            full = len(self._waiting) >= self._max_batch
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self._window, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self._flush()
+        return future.result()
+
+    def _flush(self):
+        with self._lock:
+            waiting = self._waiting
+            context = self._context
+            self._waiting = {}
+            self._context = None
+            self._priority = None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not waiting:
+            return
+        ids = list(waiting)
+        try:
+            results = context.run(self._batch_get_chunk, ids)
+        except Exception as e:
+            for futures in waiting.values():
+                for future in futures:
+                    future.set_exception(e)
+            return
+        # An id without result fails, rather than waiting forever
+        results = list(results) + [{}] * (len(ids) - len(results))
+        for id, result in zip(ids, results):
+            for future in waiting[id]:
+                if "mediaItem" in result:
+                    future.set_result(result["mediaItem"])
+                else:
+                    future.set_exception(MediaError(result.get("status")))
+
+
+class CreateReport(list):
+    """
+    Report of a batchCreate(): a list of the newMediaItemResults, one per
+    media item, in the order of the media items; each one has either the
+    "mediaItem" created or the error "status".
+
+    Attributes
+    ----------
+    retried: int
+        Number of media items submitted again after a transient failure
+    rounds: int
+        Number of rounds of requests (1 if nothing was retried)
+    """
+
+    def __init__(self, results=(), retried=0, rounds=0):
+        super().__init__(results)
+        self.retried = retried
+        self.rounds = rounds
+
+    @property
+    def created(self):
+        """ Results of the media items created """
+        return [r for r in self if "mediaItem" in r]
+
+    @property
+    def failed(self):
+        """ Results of the media items not created """
+        return [r for r in self if "mediaItem" not in r]
+
+
+def _is_transient(result):
+    return ("mediaItem" not in result
+            and result.get("status", {}).get("code") in TRANSIENT_STATUS)
+
+
+def _is_transient_error(error):
+    # batchCreate is not idempotent: only requests refused by the server
+    return is_retryable(error, idempotent=False)
+
+
+class QueryError(MediaError):
+    """Exception raised when a query cannot be evaluated"""
+    pass
+
+
+_DATE_KEYS = ("year", "month", "day")
+
+
+def _date_parts(media):
+    creation_time = media.get("mediaMetadata", {}).get("creationTime", "")
+    if not creation_time:
+        return (0, 0, 0)
+    return (int(creation_time[0:4]),
+            int(creation_time[5:7]),
+            int(creation_time[8:10]))
+
+
+def _date_test(filter_val):
+    """ Client-side test of a date() or date_range() filter """
+    if filter_val.isinstance('DATE'):
+        start = end = filter_val.val
+    else:
+        start = filter_val.val["startDate"]
+        end = filter_val.val["endDate"]
+    # Components set to 0 match any value
+    keys = [i for i, k in enumerate(_DATE_KEYS) if start[k] != 0]
+    low = tuple(start[_DATE_KEYS[i]] for i in keys)
+    high = tuple(end[_DATE_KEYS[i]] for i in keys)
+
+    def test(media):
+        parts = _date_parts(media)
+        return low <= tuple(parts[i] for i in keys) <= high
+    return test
+
+
+def _client_filters(filters, exclude):
+    """
+    Predicates evaluating the API filters on the client, all of them
+    to be matched, for the searches where the API does not accept them
+    """
+    predicates = []
+    for f in filters:
+        if f.isinstance('DATE') or f.isinstance('DATERANGE'):
+            predicates.append(where(_date_test(f)))
+        elif f.isinstance('MEDIAFILTER'):
+            if f.val != 'ALL_MEDIA':
+                kind = f.val.lower()
+                predicates.append(where(
+                    lambda media, kind=kind:
+                        kind in media.get("mediaMetadata", {})))
+        else:
+            raise QueryError(
+                "{} filters cannot be evaluated on the client".format(
+                    f.type))
+    if exclude:
+        raise QueryError(
+            "content exclusions cannot be evaluated on the client")
+    return predicates
+
+
+# Filters of the same group are ORed by the API, up to these many
+_OR_GROUPS = {"DATE": 5, "CONTENTFILTER": 10}
+
+
+def _group(filter_val):
+    return "DATE" if filter_val.isinstance('DATERANGE') else filter_val.type
+
+
+def _one_per_group(filters):
+    """
+    Splits filters to be all matched in those sent with a search, one
+    per group (the API ORs the filters of a group), and the others,
+    to be evaluated on the client
+    """
+    sent = {}
+    others = []
+    for f in filters:
+        group = _group(f)
+        if group not in sent:
+            sent[group] = f
+        elif [f.type, f.val] != [sent[group].type, sent[group].val]:
+            if group not in ("DATE", "MEDIAFILTER"):
+                raise QueryError(
+                    "{} filters are ORed by the API, "
+                    "they cannot be ANDed in a search".format(group))
+            others.append(f)
+    return list(sent.values()), others
+
+
+def _dnf(expression):
+    """ Disjunctive normal form: list of conjunctions (lists of Val) """
+    if isinstance(expression, Val):
+        return [[expression]]
+    if isinstance(expression, Or):
+        return [c for term in expression.terms for c in _dnf(term)]
+    if isinstance(expression, (And, list)):
+        terms = expression if isinstance(expression, list) \
+            else expression.terms
+        conjunctions = [[]]
+        for term in terms:
+            conjunctions = [a + b for a in conjunctions for b in _dnf(term)]
+        return conjunctions
+    raise QueryError("not a search filter: {!r}".format(expression))
+
+
+def _conjunction_term(conjunction, values):
+    """
+    Returns a conjunction as a dict group -> frozenset of filter keys,
+    or None if no media can match it
+    """
+    term = {}
+    for f in conjunction:
+        key = json.dumps([f.type, f.val], sort_keys=True)
+        values[key] = f
+        term.setdefault(_group(f), set()).add(key)
+    media_types = term.get("MEDIAFILTER", set())
+    if len(media_types) > 1:
+        media_types.discard(json.dumps(["MEDIAFILTER", "ALL_MEDIA"]))
+        if len(media_types) > 1:
+            return None
+    for group, keys in term.items():
+        if len(keys) > 1:
+            raise QueryError(
+                "{} filters are ORed by the API, "
+                "they cannot be ANDed in a search".format(group))
+    return {group: frozenset(keys) for group, keys in term.items()}
+
+
+def _subsumes(a, b):
+    """ True if all the media matching b match a too """
+    return all(g in b and b[g] <= a[g] for g in a)
+
+
+def _plan(expression):
+    """
+    Turns a filter expression in the fewest sets of filters
+    (lists of Val), each one accepted by a single search request
+    """
+    values = {}
+    terms = []
+    for conjunction in _dnf(expression):
+        term = _conjunction_term(conjunction, values)
+        if term is not None:
+            terms.append(term)
+    merged = True
+    while merged:
+        merged = False
+        for i, j in itertools.permutations(range(len(terms)), 2):
+            a, b = terms[i], terms[j]
+            if _subsumes(a, b):
+                del terms[j]
+                merged = True
+                break
+            if a.keys() != b.keys():
+                continue
+            diff = [g for g in a if a[g] != b[g]]
+            if len(diff) == 1 and diff[0] in _OR_GROUPS and \
+                    len(a[diff[0]] | b[diff[0]]) <= _OR_GROUPS[diff[0]]:
+                terms[i] = {**a, diff[0]: a[diff[0]] | b[diff[0]]}
+                del terms[j]
+                merged = True
+                break
+    return [[values[key] for keys in term.values() for key in sorted(keys)]
+            for term in terms]
+
+
+def _run_query(source, predicate, limit, transform):
+    found = 0
+    try:
+        if limit is not None and limit <= 0:
+            return
+        for media in source:
+            if predicate is not None and not predicate(media):
+                continue
+            yield media if transform is None else transform(media)
+            found += 1
+            if found == limit:
+                return
+    finally:
+        # Stops the prefetching of pages no longer needed
+        close = getattr(source, "close", None)
+        if close is not None:
+            close()
+
+
 def date(year=0, month=0, day=0):
     """
     Return a Date object.
@@ -454,6 +902,14 @@ class Media:
     _SHOW_ONLY_CREATED = False
     _INCLUDE_ARCHIVED = False
 
+    _RESUMABLE_UPLOAD = False
+    _UPLOAD_SESSION_FILE = None
+
+    # Earliest date sought by list_parallel()
+    _TIMELINE_START = datetime.date(1900, 1, 1)
+    # Pages walked in a date shard before splitting it in two
+    _SHARD_SPLIT_PAGES = 10
+
     def __init__(self, service):
         """
         Constructor. It takes the service created with authorize.init()
@@ -487,6 +943,12 @@ class Media:
         self._service = service["service"]
         self._secrets = service["secrets"]
         self._staged_media = []
+        self._staged_lock = threading.Lock()
+        self._upload_index = None
+        self._journal = None
+        self._mirror = None
+        self._mirror_staleness = 0
+        self._coalescer = None
 
     # UTILITIES
     def set_list_pagination(self, n: int):
@@ -541,6 +1003,145 @@ class Media:
         """
         self._INCLUDE_ARCHIVED = val
 
+    def set_resumable_upload(self, val: bool, session_file=None):
+        """
+        Sets the stage_media method to use the resumable upload protocol
+
+        Parameters
+        ----------
+        val: bool
+            value to be set (default is False, raw upload)
+        session_file: Path, optional
+            JSON file where the upload sessions are saved, so that
+            an interrupted upload can be resumed by a later stage_media()
+
+        Examples
+        --------
+        >>> media_manager.set_resumable_upload(True, 'uploads.json')
+        """
+        self._RESUMABLE_UPLOAD = val
+        self._UPLOAD_SESSION_FILE = session_file
+
+    def set_upload_index(self, index):
+        """
+        Sets an index of the uploaded files, used to skip the files
+        whose content is already in the library
+
+        Parameters
+        ----------
+        index: UploadIndex
+            Index of the uploads (see dedup.UploadIndex), None to disable
+
+        Examples
+        --------
+        >>> from gphotospy.dedup import UploadIndex
+        >>> media_manager.set_upload_index(UploadIndex('uploads.db'))
+        """
+        self._upload_index = index
+
+    def set_journal(self, journal):
+        """
+        Sets a journal where the upload tokens are saved until the media
+        are created, so that they survive a crash (see recover())
+
+        Parameters
+        ----------
+        journal: UploadJournal
+            Journal of the upload tokens (see journal.UploadJournal),
+            None to disable
+
+        Examples
+        --------
+        >>> from gphotospy.journal import UploadJournal
+        >>> media_manager.set_journal(UploadJournal('pending.db'))
+        """
+        self._journal = journal
+
+    def set_mirror(self, mirror, max_staleness=3600):
+        """
+        Sets a local mirror of the library (see mirror.Mirror), used by
+        get() and list() instead of the API while it is fresh enough
+
+        Parameters
+        ----------
+        mirror: Mirror
+            Local mirror of the library, None to disable
+        max_staleness: int, optional
+            Maximum seconds since the last refresh of the mirror for
+            it to be used (default 3600)
+
+        Examples
+        --------
+        >>> from gphotospy.mirror import Mirror
+        >>> mirror = Mirror('library.db')
+        >>> mirror.refresh(media_manager)
+        >>> media_manager.set_mirror(mirror, max_staleness=6 * 3600)
+        """
+        self._mirror = mirror
+        self._mirror_staleness = max_staleness
+
+    def set_get_coalescing(self, val: bool, window=0.01):
+        """
+        Sets whether get() calls made concurrently by many threads are
+        merged in a single batchGet request (up to 50 ids)
+
+        Parameters
+        ----------
+        val: bool
+            True to merge the get() calls, False to send each of them
+        window: float, optional
+            Seconds a get() waits for other calls to be merged with,
+            before the request is sent (default 0.01).
+            A request is sent at once when 50 ids are waiting
+
+        Examples
+        --------
+        >>> media_manager.set_get_coalescing(True)
+        >>> with ThreadPoolExecutor(max_workers=32) as executor:
+        ...     media = list(executor.map(media_manager.get, ids))
+        """
+        if val:
+            self._coalescer = _GetCoalescer(self._batch_get_chunk, window)
+        else:
+            self._coalescer = None
+
+    def _fresh_mirror(self):
+        if self._mirror is None:
+            return None
+        if not self._mirror.is_fresh(self._mirror_staleness):
+            return None
+        return self._mirror
+
+    def recover(self):
+        """
+        Stages again the media uploaded, but not created, by a previous
+        run, as found in the journal (see set_journal()).
+
+        Only tokens still valid are recovered; the staged media are then
+        created through the batchCreate() method (see).
+
+        Returns
+        -------
+        List of the recovered upload objects
+
+        Examples
+        --------
+        >>> media_manager.set_journal(UploadJournal('pending.db'))
+        >>> media_manager.recover()
+        >>> media_manager.batchCreate()
+        """
+        if self._journal is None:
+            return []
+        with self._staged_lock:
+            staged_tokens = set(
+                m["simpleMediaItem"]["uploadToken"]
+                for m in self._staged_media)
+            recovered = [
+                m for m in self._journal.pending()
+                if m["simpleMediaItem"]["uploadToken"] not in staged_tokens]
+            self._staged_media.extend(recovered)
+        return recovered
+
     def get_upload_object(self, upload_token, file_name="", description=""):
         """
         Manually constructs an upload object.
@@ -586,7 +1187,9 @@ class Media:
 
         Returns
         -------
-        New media object if successfull, None if unsuccessfull.
+        New media object if successfull, None if unsuccessfull, or if the
+        same content is already in the library, or uploaded from another
+        file in this run (see set_upload_index()).
 
         Examples
         --------
@@ -598,23 +1201,292 @@ class Media:
 
         >>> media_manager.batchCreate()
         """
-        upload_token = upload(self._secrets, media_file)
+        if self._is_uploaded(media_file):
+            return None
+        new_media = self._upload_media(media_file, description)
+        if new_media is None:
+            return None
+
+        with self._staged_lock:
+            self._staged_media.append(new_media)
+        return new_media
+
+    def stage_many(self, media_files, workers=4, description=""):
+        """
+        Stage many media at once, uploading them in parallel
+        through a pool of threads.
+
+        As with stage_media(), all the staged media should be finalized
+        through the batchCreate() method (see).
+
+        Parameters
+        ----------
+        media_files: [Path]
+            List of paths of the media files to be uploaded
+        workers: int, optional
+            Maximum number of concurrent uploads (default 4)
+        description: str, optional
+            Description to display in the media info panel of each media
+
+        Returns
+        -------
+        List of results, in the same order as media_files.
+        Each result is a dict with the keys:
+            * "media_file": the path of the file
+            * "upload_object": the new media object, None if unsuccessfull
+            * "error": the exception raised by the upload, if any
+            * "skipped": True if the same content is already in the library,
+              or uploaded from another file in this run (see
+              set_upload_index())
+
+        Examples
+        --------
+        Stage all the pictures in a folder, 8 at a time
+
+        >>> files = glob.glob('pictures/*.jpg')
+        >>> results = media_manager.stage_many(files, workers=8)
+        >>> failed = [r["media_file"] for r in results if r["error"]]
+
+        Finalize all staged media
+
+        >>> media_manager.batchCreate()
+        """
+        def stage(media_file):
+            return self._try_upload(media_file, description)
+
+        results = []
+        with ContextThreadPoolExecutor(
+                max_workers=max(workers, 1)) as executor:
+            # Results come back in input order, so the staged media
+            # keep the order of media_files
+            for media_file, (new_media, error, skipped) in zip(
+                    media_files, executor.map(stage, media_files)):
+                if new_media is not None:
+                    with self._staged_lock:
+                        self._staged_media.append(new_media)
+                results.append({
+                    "media_file": media_file,
+                    "upload_object": new_media,
+                    "error": error,
+                    "skipped": skipped
+                })
+        return results
+
+    def stage_and_create(self,
+                         media_files,
+                         workers=4,
+                         album_id=None,
+                         album_position=None,
+                         description=""):
+        """
+        Uploads media and creates them in the Photos account in a pipeline:
+        as soon as 50 media are uploaded, they are created in the
+        background while the uploads go on.
+
+        The media do not go through the staged list, so only the batch
+        being filled is held in memory, whatever the number of files.
+
+        Parameters
+        ----------
+        media_files: iterable of Path
+            Paths of the media files to be uploaded. It can be a generator
+        workers: int, optional
+            Maximum number of concurrent uploads (default 4)
+        album_id: str, optional
+            Id of the album to attach the media to. If not specified,
+            it will create an album with the current date (see batchCreate)
+        album_position: POSITION, optional
+            Position in the album where to put the media.
+            See the relative class in album.POSITION
+        description: str, optional
+            Description to display in the media info panel of each media
+
+        Yields
+        ------
+        One result per media file, as soon as it is available, in the
+        order of media_files. The uploads go on while a slow one holds
+        back the batches, until PIPELINE_BUFFER uploads after it are
+        finished. Each result is a dict with the keys:
+            * "media_file": the path of the file
+            * "result": the media item result of the creation,
+              None if the upload or the creation failed
+            * "error": the exception raised uploading or creating, if any
+            * "skipped": True if the same content is already in the library,
+              or uploaded from another file in this run (see
+              set_upload_index())
+
+        Examples
+        --------
+        Upload a folder and report the progress
+
+        >>> files = glob.glob('pictures/*.jpg')
+        >>> for res in media_manager.stage_and_create(files, workers=8):
+        ...     print(res["media_file"], res["error"] or "ok")
+        """
+        if album_position is None:
+            album_position = set_position()
+        workers = max(workers, 1)
+        album = {"id": album_id}
+
+        def create(batch):
+            # Runs in a single background thread, so batches are created,
+            # and placed in the album, in order
+            new_media_items = [m for _, m, _, _ in batch if m is not None]
+            results = []
+            create_error = None
+            try:
+                if new_media_items:
+                    if album["id"] is None:
+                        album["id"] = self._create_empty_album()
+                    results = self._create_batch(
+                        album["id"], album_position, new_media_items)
+            except Exception as e:
+                create_error = e
+            by_token = {r.get("uploadToken"): r for r in results}
+            return [{
+                "media_file": media_file,
+                "result": None if new_media is None else by_token.get(
+                    new_media["simpleMediaItem"]["uploadToken"]),
+                "error": error if new_media is None else create_error,
+                "skipped": skipped
+            } for media_file, new_media, error, skipped in batch]
+
+        files = iter(media_files)
+        # Uploads in progress (future -> index), and finished ones
+        # waiting for those before them (index -> batch entry): a
+        # big file holds back the batches, not the other uploads
+        running = {}
+        finished = {}
+        buffered = max(PIPELINE_BUFFER, 2 * workers)
+        submitted = 0
+        head = 0
+        creations = deque()
+        batch = []
+        exhausted = False
+        with ContextThreadPoolExecutor(max_workers=workers) as uploader, \
+                ContextThreadPoolExecutor(max_workers=1) as creator:
+            while True:
+                # Keep all the uploaders busy, without queuing all the files
+                while not exhausted and len(running) < workers \
+                        and len(running) + len(finished) < buffered:
+                    try:
+                        media_file = next(files)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    running[uploader.submit(
+                        self._try_upload, media_file, description)] = (
+                            submitted, media_file)
+                    submitted += 1
+
+                # Batches are formed in the order of media_files; failed
+                # uploads go in them too, to keep the order of results
+                while head in finished:
+                    batch.append(finished.pop(head))
+                    head += 1
+                    if len(batch) == 50:
+                        creations.append(creator.submit(create, batch))
+                        batch = []
+                done = exhausted and not running and not finished
+                if batch and done:
+                    creations.append(creator.submit(create, batch))
+                    batch = []
+
+                while creations and (creations[0].done() or done):
+                    for result in creations.popleft().result():
+                        yield result
+
+                if done and not creations:
+                    break
+
+                waiting = set(running)
+                if creations:
+                    waiting.add(creations[0])
+                for future in wait(
+                        waiting, return_when=FIRST_COMPLETED).done:
+                    if future in running:
+                        index, media_file = running.pop(future)
+                        finished[index] = (media_file, ) + future.result()
+
+    def _try_upload(self, media_file, description=""):
+        """ Returns (new media, error, skipped) """
+        try:
+            if self._is_uploaded(media_file):
+                return (None, None, True)
+            new_media = self._upload_media(media_file, description)
+        except Exception as e:
+            return (None, e, False)
+        if new_media is None:
+            return (None, MediaError(
+                "upload of {} failed".format(media_file)), False)
+        return (new_media, None, False)
+
+    def _upload_media(self, media_file, description=""):
+        try:
+            upload_token = upload(
+                self._secrets,
+                media_file,
+                resumable=self._RESUMABLE_UPLOAD,
+                session_file=self._UPLOAD_SESSION_FILE)
+        except BaseException:
+            self._release_upload(media_file)
+            raise
         if upload_token is None:
+            self._release_upload(media_file)
             return None
+        if self._upload_index is not None:
+            self._upload_index.record_upload(media_file, upload_token)
         new_media = self.get_upload_object(
             upload_token,
             os.path.basename(media_file),
             description)
-
-        self._staged_media.append(new_media)
+        if self._journal is not None:
+            self._journal.add(new_media, media_file)
         return new_media
 
+    def _is_uploaded(self, media_file):
+        """
+        True if the content of the file is already in the library, or
+        uploaded from another file in this run; otherwise claims it
+        """
+        if self._upload_index is None:
+            return False
+        return not self._upload_index.claim(media_file)
+
+    def _release_upload(self, media_file):
+        if self._upload_index is not None:
+            self._upload_index.release(media_file)
+
+    def _is_created(self, media_item):
+        upload_token = media_item.get(
+            "simpleMediaItem", {}).get("uploadToken")
+        if self._journal is not None \
+                and self._journal.is_created(upload_token):
+            return True
+        if self._upload_index is not None \
+                and self._upload_index.is_created(upload_token):
+            return True
+        return False
+
+    def _record_created(self, results):
+        for result in results:
+            media_item = result.get("mediaItem")
+            if media_item is None:
+                continue
+            if self._upload_index is not None:
+                self._upload_index.record_created(
+                    result.get("uploadToken"), media_item.get("id"))
+            if self._journal is not None:
+                self._journal.mark_created(
+                    result.get("uploadToken"), media_item.get("id"))
+
     # API ENDPOINTS
 
     def batchCreate(self,
                     album_id=None,
                     album_position=None,
-                    media_items=None):
+                    media_items=None,
+                    workers=1):
         """
         Create medias in the Photos account
 
@@ -637,11 +1509,29 @@ class Media:
         album_position: POSITION, optional
             Position in the album where to put the media.
             See the relative class in album.POSITION
+        workers: int, optional
+            Number of batches of 50 media created concurrently, when
+            album_position is not given (default 1: Google recommends
+            one batchCreate at a time per user)
 
         Returns
         -------
-        Media item result (some media creation may fail, the list has
-        the results for each attempted item creation)
+        CreateReport: list of the media item results (some media creation
+        may fail, the list has the results for each attempted item
+        creation), with the number of media retried
+
+        Notes
+        -----
+        The batches are created one after the other by default. With
+        workers > 1 and without album_position they are created
+        concurrently, and their media may be placed in the album
+        in any order. With album_position the batches are created one after the other,
+        each one after the last media of the previous one, so that
+        the media stay in order.
+
+        Media failing for a transient reason (see TRANSIENT_STATUS)
+        are submitted again, in new batches, up to CREATE_RETRIES times.
+        Retried media are placed after the others.
 
         Examples
         --------
@@ -671,31 +1561,104 @@ class Media:
 
         >>> media_manager.batchCreate(album_id, media_items=upload_items)
         """
+        ordered = album_position is not None
         if album_position is None:
             album_position = set_position()
-        if media_items is None:
-            if len(self._staged_media) > 0:
-                media_items = self._staged_media
-            else:
+        staged = media_items is None
+        if staged:
+            with self._staged_lock:
+                media_items = list(self._staged_media)
+            if len(media_items) == 0:
                 return None
+        staged_count = len(media_items)
+        # Never create twice media already created from the same upload
+        media_items = [m for m in media_items if not self._is_created(m)]
+        if len(media_items) == 0:
+            if staged:
+                with self._staged_lock:
+                    del self._staged_media[:staged_count]
+            return CreateReport()
         if album_id is None:
             album_id = self._create_empty_album()
 
-        request_body = {
-            "album_id": album_id,
-            "albumPosition": album_position
-        }
-        if album_id is None:
-            request_body["albumId"] = album_id
+        by_token = {}
+        pending = media_items
+        position = album_position
+        rounds = 0
+        retried = 0
+        while True:
+            results, position = self._create_batches(
+                album_id, position, pending, workers, ordered)
+            rounds += 1
+            by_token.update((r.get("uploadToken"), r) for r in results)
+            pending = [m for m in pending if _is_transient(by_token.get(
+                m["simpleMediaItem"]["uploadToken"], {}))]
+            if not pending or rounds > CREATE_RETRIES:
+                break
+            time.sleep(CREATE_BACKOFF * 2 ** (rounds - 1))
+            retried += len(pending)
+
+        if staged:
+            # Media staged meanwhile by other threads stay staged
+            with self._staged_lock:
+                del self._staged_media[:staged_count]
+        missing = {"status": {"code": 2, "message": "no result"}}
+        return CreateReport(
+            [by_token.get(m["simpleMediaItem"]["uploadToken"], missing)
+             for m in media_items], retried, rounds)
+
+    def _create_batches(self,
+                        album_id,
+                        album_position,
+                        media_items,
+                        workers,
+                        ordered):
+        """
+        Creates the media in batches of 50, concurrently unless ordered.
+        Returns the results, and the position following the media created
+        """
+        def create(position, batch):
+            try:
+                return self._create_batch(album_id, position, batch)
+            except Exception as e:
+                # The whole batch failed: a failure per media
+                code = 14 if _is_transient_error(e) else 2
+                return [{
+                    "uploadToken": m["simpleMediaItem"]["uploadToken"],
+                    "status": {"code": code, "message": str(e)}
+                } for m in batch]
 
         results = []
+        if not ordered:
+            with ContextThreadPoolExecutor(
+                    max_workers=max(workers, 1)) as executor:
+                for batch_results in executor.map(
+                        lambda batch: create(album_position, batch),
+                        batches(media_items, 50)):
+                    results.extend(batch_results)
+            return results, album_position
         for batch in batches(media_items, 50):
-            request_body["newMediaItems"] = batch
-            result = self._service.mediaItems().batchCreate(body=request_body).execute()
-            results.append(result)
-
-        self._staged_media.clear()
-        return list(itertools.chain.from_iterable(result.get("newMediaItemResults") for result in results))
+            batch_results = create(album_position, batch)
+            results.extend(batch_results)
+            created = [r["mediaItem"]["id"] for r in batch_results
+                       if "mediaItem" in r]
+            if created:
+                album_position = set_position(POSITION.AFTER_MEDIA,
+                                              created[-1])
+        return results, album_position
+
+    def _create_batch(self, album_id, album_position, batch):
+        """ Creates up to 50 media, returns their newMediaItemResults """
+        request_body = {
+            "album_id": album_id,
+            "albumPosition": album_position,
+            "newMediaItems": batch
+        }
+        result = execute(self._service.mediaItems().batchCreate(
+            body=request_body))
+        new_media_items = result.get("newMediaItemResults", [])
+        self._record_created(new_media_items)
+        return new_media_items
 
     def _create_empty_album(self):
         from .album import Album
@@ -739,16 +1702,88 @@ class Media:
 
         >>> media_manager.get(media_id)
         {'id': '...', 'productUrl': 'https://photos.google.com/lr/photo/...', 'baseUrl': 'https://lh3.googleusercontent.com/lr/...', 'mimeType': 'image/jpeg', 'mediaMetadata': {'creationTime': '...', 'width': '899', 'height': '1599', 'photo': {}}, 'filename': '...jpg'}
+
+        If a fresh mirror is set (see set_mirror()) the media info
+        comes from the mirror, when found there
+        """
+        mirror = self._fresh_mirror()
+        if mirror is not None:
+            media = mirror.get(id)
+            if media is not None:
+                return media
+        if self._coalescer is not None:
+            return self._coalescer.get(id)
+        return execute(self._service.mediaItems().get(mediaItemId=id))
+
+    def _batch_get_chunk(self, ids):
+        result = execute(self._service.mediaItems().batchGet(
+            mediaItemIds=ids))
+        return result.get("mediaItemResults", [])
+
+    def batch_get(self, ids, workers=4):
         """
-        return self._service.mediaItems().get(mediaItemId=id).execute()
+        Returns the media info of many ids, with batchGet requests
+        of up to 50 ids each, sent concurrently
+
+        Parameters
+        ----------
+        ids: [str]
+            Ids of the media to get
+        workers: int, optional
+            Number of batchGet requests sent concurrently (default 4)
 
-    def list(self):
+        Returns
+        -------
+        List of the media item results, in the order of ids: each one has
+        either the "mediaItem" or the error "status" of its id
+
+        Examples
+        --------
+        Refresh the base urls of many media
+
+        >>> results = media_manager.batch_get(ids)
+        >>> media = [r["mediaItem"] for r in results if "mediaItem" in r]
+        """
+        chunks = list(batches(list(ids), 50))
+        with ContextThreadPoolExecutor(
+                max_workers=max(workers, 1)) as executor:
+            return [result
+                    for results in executor.map(self._batch_get_chunk, chunks)
+                    for result in results]
+
+    def list(self,
+             prefetch=0,
+             use_mirror=True,
+             resume_from=None,
+             fields=None,
+             as_records=False):
         """
         Iterator over the meda present in the Google Photos account
 
+        Parameters
+        ----------
+        prefetch: int, optional
+            Number of pages to fetch ahead on a background thread,
+            while the current page is consumed (default 0, no prefetch)
+        use_mirror: bool, optional
+            If False always asks the API, even if a fresh mirror is set
+            (default True, see set_mirror())
+        resume_from: dict, optional
+            Checkpoint of a previous walk over the same list, as returned
+            by the checkpoint() method of the iterator: the walk continues
+            from the item following the checkpoint
+        fields: str or [str], optional
+            Fields of each media to be returned, in the partial response
+            format of the API, such as "id,mediaMetadata/creationTime"
+            (default None, all the fields)
+        as_records: bool, optional
+            If True yields MediaRecord objects instead of dicts
+            (default False)
+
         Yields
         -------
-        Iterator over the list of media
+        Iterator over the list of media. The iterator has a checkpoint()
+        method returning a JSON-serializable position of the walk
 
         Notes
         -----
@@ -767,6 +1802,13 @@ class Media:
         with 1 < n < 100, since at least 1 album must be sought
         and 100 is the API maximum.  25 is API default.
 
+        If a fresh mirror is set (see set_mirror()) the media come from
+        the mirror, without any API request, newest first; fields are
+        selected from the stored media, and a checkpoint resumes the
+        walk on the mirror.
+        The mirror holds the media found by search(), which follows
+        show_archived() and show_only_created().
+
         Examples
         --------
         Get iterator
@@ -776,75 +1818,259 @@ class Media:
         Print first item
 
         >>> print(next(media_iterator))
+
+        Overlap the download of the next 2 pages with the processing
+
+        >>> for media in media_manager.list(prefetch=2):
+        ...     process(media)
+
+        Save a checkpoint after each media, and resume from it later
+
+        >>> media_iterator = media_manager.list()
+        >>> for media in media_iterator:
+        ...     export(media)
+        ...     save(json.dumps(media_iterator.checkpoint()))
+
+        >>> checkpoint = json.loads(load())
+        >>> media_iterator = media_manager.list(resume_from=checkpoint)
+
+        Only ids and creation times, to cut the size of the responses
+
+        >>> media_iterator = media_manager.list(
+        ...     fields="id,mediaMetadata/creationTime")
+
+        Keep a million media in memory as compact records
+
+        >>> records = list(media_manager.list(as_records=True))
+        >>> records[0].creation_time
+        1412262083
         """
-        page_token = ""
-        while page_token is not None:
-            result = self._service.mediaItems().list(
-                pageSize=self._LIST_PAGESIZE,
-                pageToken=page_token
-            ).execute()
-            page_token = result.get("nextPageToken", None)
-            curr_list = result.get("mediaItems",[])
-            for media in curr_list:
-                yield media
+        transform = MediaRecord.from_api if as_records else None
+        mirror = self._fresh_mirror() if use_mirror else None
+        if resume_from is not None:
+            # A walk goes on where it started, even if the mirror
+            # got stale meanwhile
+            from_mirror = "mirror" in (resume_from.get("query") or {})
+            mirror = self._mirror if from_mirror and use_mirror else None
+        if mirror is not None:
+            return mirror.list(prefetch, resume_from, fields, transform)
+
+        query = {"pageSize": self._LIST_PAGESIZE}
+        mask = fields_mask("mediaItems", fields)
+
+        def fetch_page(page_token):
+            return execute(self._service.mediaItems().list(
+                pageToken=page_token, fields=mask, **query))
+        return Paginator(fetch_page, "mediaItems", prefetch,
+                         query, resume_from, transform)
+
+    def to_columns(self, prefetch=2, use_mirror=True):
+        """
+        Metadata of all the media, in columnar buffers
 
-    def _get_all_media_items(self, extra_request_body: dict):
-        page_token = ""
-        request_body = {
-            **extra_request_body,
-            "pageSize": self._SEARCH_PAGESIZE,
-            "pageToken": page_token
-        }
+        Parameters
+        ----------
+        prefetch: int, optional
+            Number of pages to fetch ahead while the current one
+            is stored in the columns (default 2)
+        use_mirror: bool, optional
+            If False always asks the API, even if a fresh mirror is set
+            (default True)
 
-        while page_token is not None:
-            request_body["pageToken"] = page_token
-            result = self._service.mediaItems().search(
-                body=request_body).execute()
-            page_token = result.get("nextPageToken", None)
-            curr_list = result.get("mediaItems")
-            for media in curr_list:
-                yield media
+        Returns
+        -------
+        Columns:
+            See gphotospy.columns.Columns
+
+        Notes
+        -----
+        Only the fields stored in the columns are requested to the API.
 
-    def search(self, filter, exclude=None):
+        Examples
+        --------
+        >>> columns = media_manager.to_columns()
+        >>> max(columns.creation_time)
+        1412262083
         """
-        Iterator over a filtered search of all the media
-        present in the Google Photos account.
+        media_iterator = self.list(prefetch=prefetch,
+                                   use_mirror=use_mirror,
+                                   fields=COLUMN_FIELDS)
+        return Columns().extend(media_iterator)
+
+    def to_numpy(self, prefetch=2, use_mirror=True):
+        """
+        Metadata of all the media, as a dict of NumPy arrays
+        (see to_columns()). Requires NumPy.
+
+        Examples
+        --------
+        >>> arrays = media_manager.to_numpy()
+        >>> numpy.bincount(arrays["mime_category"])
+        """
+        return self.to_columns(prefetch, use_mirror).to_numpy()
+
+    def list_parallel(self,
+                      workers=4,
+                      start=None,
+                      end=None,
+                      ordered=False,
+                      fields=None):
+        """
+        Iterator over the media present in the Google Photos account,
+        fetched in parallel by splitting the timeline in date ranges.
 
         Parameters
         ----------
-        fileter: array
-            filters to be included
-        exclude: array
-            filters to be excluded
+        workers: int, optional
+            Number of date ranges searched concurrently (default 4)
+        start: Date object, optional
+            First day to search, use date() function to set it
+            (default 1 January 1900)
+        end: Date object, optional
+            Last day to search, use date() function to set it
+            (default tomorrow)
+        ordered: bool, optional
+            If True the media are yielded ordered by creation time, once
+            all of them are fetched; otherwise they are yielded as soon as
+            they arrive (default False)
+        fields: str or [str], optional
+            Fields of each media to be returned, as in list().
+            They must include "id"; "mediaMetadata/creationTime" is
+            always added (default None, all the fields)
 
         Yields
         ------
-        Iterator over the list of media
+        Iterator over the list of media, each one only once
 
         Notes
         -----
-        There are 4 categories of filters, each with its own class.
-        More info on the relative class.
-        - Date Filter:
-        - Content Filter:       class CONTENTFILTER
-        - Media Type Filter:    class MEDIAFILTER
-        - Feature Fileter:      class FEATUREFILTER
+        The timeline is split in date ranges, each searched with
+        search() and a date_range() filter. A range still having pages
+        after a few of them is split again in two halves, so that dense
+        periods are spread over the workers too. Since the search returns
+        the newest media first, only the days up to the oldest media
+        already fetched are split: only the media of that day are
+        fetched twice, and none is yielded twice.
 
-        Google Photo API search request returns in reality an object containing
-        a paginated list of media.
+        The search honors show_archived() and show_only_created().
 
-        This function transforms the list in an iterator
-        and takes care of pagination behind the scenes.
+        Examples
+        --------
+        >>> for media in media_manager.list_parallel(workers=8):
+        ...     process(media)
 
-        Since there is a maximum limit on API requests per day per project
-        it does not seem well to ask for less than the maximum pagination
-        possible.
+        Only the media of the last decade, from the oldest
 
-        However, if there are concerns of bandwith or speed,
-        the pagination can be set by album.set_search_pagination(n)
-        with 1 < n < 100, since at least 1 album must be sought
-        and 100 is the API maximum.  25 is API default.
+        >>> media_iterator = media_manager.list_parallel(
+        ...     start=date(2010, 1, 1), ordered=True)
         """
+        if start is None:
+            first_day = self._TIMELINE_START
+        else:
+            first_day = datetime.date(**start.val)
+        if end is None:
+            last_day = datetime.date.today() + datetime.timedelta(days=1)
+        else:
+            last_day = datetime.date(**end.val)
+        workers = max(workers, 1)
+        base_filters = self._search_filters([])
+        if fields is not None:
+            # Needed to split the ranges
+            fields = _with_field(fields, "mediaMetadata/creationTime")
+        mask = fields_mask("mediaItems", fields)
+
+        def walk(first, last):
+            """ Returns (media, sub-ranges still to walk) """
+            request_body = {
+                "filters": {
+                    **base_filters,
+                    "dateFilter": {"ranges": [{
+                        "startDate": _api_date(first),
+                        "endDate": _api_date(last)
+                    }]}
+                },
+                "pageSize": self._SEARCH_PAGESIZE,
+                "pageToken": ""
+            }
+            items = []
+            pages = 0
+            while request_body["pageToken"] is not None:
+                if pages == self._SHARD_SPLIT_PAGES:
+                    # Too dense: the search returns the newest first, so
+                    # the days after the oldest media read are done.
+                    # Only the rest is split, its oldest day read again
+                    days = (_creation_day(m) for m in items)
+                    rest = min((d for d in days if d is not None),
+                               default=last)
+                    rest = max(first, min(rest, last))
+                    if first < rest:
+                        middle = first + (rest - first) // 2
+                        return (items, [
+                            (first, middle),
+                            (middle + datetime.timedelta(days=1), rest)])
+                result = execute(self._service.mediaItems().search(
+                    body=request_body, fields=mask))
+                pages += 1
+                request_body["pageToken"] = result.get("nextPageToken", None)
+                items.extend(result.get("mediaItems") or [])
+            return (items, [])
+
+        # Start with more ranges than workers, so that they stay busy
+        shards = _split_days(first_day, last_day, workers * 4)
+        seen = set()
+        collected = []
+        with ContextThreadPoolExecutor(max_workers=workers) as executor:
+            pending = set(executor.submit(walk, a, b) for a, b in shards)
+            try:
+                while pending:
+                    done, pending = wait(
+                        pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        items, sub_ranges = future.result()
+                        for a, b in sub_ranges:
+                            pending.add(executor.submit(walk, a, b))
+                        for media in items:
+                            if media["id"] in seen:
+                                continue
+                            seen.add(media["id"])
+                            if ordered:
+                                collected.append(media)
+                            else:
+                                yield media
+            finally:
+                for future in pending:
+                    future.cancel()
+        if ordered:
+            collected.sort(key=lambda media: media.get(
+                "mediaMetadata", {}).get("creationTime", ""))
+            for media in collected:
+                yield media
+
+    def _get_all_media_items(self,
+                             extra_request_body: dict,
+                             prefetch=0,
+                             resume_from=None,
+                             fields=None,
+                             as_records=False):
+        query = {
+            **extra_request_body,
+            "pageSize": self._SEARCH_PAGESIZE
+        }
+        mask = fields_mask("mediaItems", fields)
+
+        def fetch_page(page_token):
+            request_body = {
+                **query,
+                "pageToken": page_token
+            }
+            return execute(self._service.mediaItems().search(
+                body=request_body, fields=mask))
+        transform = MediaRecord.from_api if as_records else None
+        return Paginator(fetch_page, "mediaItems", prefetch,
+                         query, resume_from, transform)
+
+    def _search_filters(self, filter, exclude=None):
+        """ Builds the filters of a search request body """
         if not isinstance(filter, list):
             filter = [filter]
         # dicts
@@ -915,11 +2141,292 @@ class Media:
         if len(feature_filters) > 0:
             search_filter["featureFilter"] = filter_feature
 
-        # print(search_filter)
+        return search_filter
+
+    def search(self,
+               filter,
+               exclude=None,
+               prefetch=0,
+               resume_from=None,
+               fields=None,
+               as_records=False):
+        """
+        Iterator over a filtered search of all the media
+        present in the Google Photos account.
+
+        Parameters
+        ----------
+        fileter: array
+            filters to be included
+        exclude: array
+            filters to be excluded
+        prefetch: int, optional
+            Number of pages to fetch ahead on a background thread,
+            while the current page is consumed (default 0, no prefetch)
+        resume_from: dict, optional
+            Checkpoint of a previous walk over the same search, as returned
+            by the checkpoint() method of the iterator: the walk continues
+            from the item following the checkpoint
+        fields: str or [str], optional
+            Fields of each media to be returned, in the partial response
+            format of the API, such as "id,mediaMetadata/creationTime"
+            (default None, all the fields)
+        as_records: bool, optional
+            If True yields MediaRecord objects instead of dicts
+            (default False)
+
+        Yields
+        ------
+        Iterator over the list of media. The iterator has a checkpoint()
+        method returning a JSON-serializable position of the walk
+
+        Notes
+        -----
+        There are 4 categories of filters, each with its own class.
+        More info on the relative class.
+        - Date Filter:
+        - Content Filter:       class CONTENTFILTER
+        - Media Type Filter:    class MEDIAFILTER
+        - Feature Fileter:      class FEATUREFILTER
+
+        Google Photo API search request returns in reality an object containing
+        a paginated list of media.
+
+        This function transforms the list in an iterator
+        and takes care of pagination behind the scenes.
+
+        Since there is a maximum limit on API requests per day per project
+        it does not seem well to ask for less than the maximum pagination
+        possible.
+
+        However, if there are concerns of bandwith or speed,
+        the pagination can be set by album.set_search_pagination(n)
+        with 1 < n < 100, since at least 1 album must be sought
+        and 100 is the API maximum.  25 is API default.
+        """
+        search_filter = self._search_filters(filter, exclude)
+        return self._get_all_media_items(
+            {"filters": search_filter}, prefetch, resume_from, fields,
+            as_records)
+
+    def query(self,
+              *filters,
+              album_id=None,
+              exclude=None,
+              limit=None,
+              prefetch=0,
+              fields=None,
+              as_records=False):
+        """
+        Iterator over the media matching all the filters.
+
+        The filters are either API filters (date(), date_range(),
+        CONTENTFILTER, MEDIAFILTER, FEATUREFILTER), sent to the API
+        with the search, or client-side predicates (see gphotospy.query),
+        evaluated on each media as it is fetched.
+
+        The API ORs the filters of the same group (dates, content
+        categories, media types), so only one of each group is sent:
+        the other dates and media types are evaluated on the client,
+        and a second content category or feature raises a QueryError
+        (see search_any() for ORs).
+
+        Parameters
+        ----------
+        filters: Val, Predicate or callable
+            Filters the media must match
+        album_id: str, optional
+            Searches only in the album. The API does not accept filters
+            on album searches, so date and media type filters are then
+            evaluated on the client (content and feature filters raise
+            a QueryError)
+        exclude: CONTENTFILTER or [CONTENTFILTER], optional
+            Content categories to be excluded
+        limit: int, optional
+            Maximum number of media yielded; no more pages are fetched
+            once reached (default None, all the media)
+        prefetch: int, optional
+            Number of pages to fetch ahead on a background thread
+            (default 0, no prefetch)
+        fields: str or [str], optional
+            Fields of each media to be returned (see list()). They must
+            include the fields used by the predicates
+        as_records: bool, optional
+            If True yields MediaRecord objects instead of dicts
+            (default False)
+
+        Yields
+        ------
+        Iterator over the media matching all the filters
+
+        Raise
+        -----
+        QueryError
+            If a filter cannot be evaluated (see album_id), or two
+            content categories or features are given
+
+        Examples
+        --------
+        Imports
+
+        >>> from gphotospy.media import MEDIAFILTER, CONTENTFILTER
+        >>> from gphotospy.query import filename, width, camera
+
+        The first 10 large photos of pets shot with a Pixel
+
+        >>> media_iterator = media_manager.query(
+        ...     MEDIAFILTER.PHOTO, CONTENTFILTER.PETS,
+        ...     width(min=3000), camera(make="Google"), limit=10)
+
+        Screenshots in an album
+
+        >>> media_iterator = media_manager.query(
+        ...     filename("Screenshot_*"), album_id=album_id)
+        """
+        api_filters = []
+        predicates = []
+        for f in filters:
+            if isinstance(f, Val):
+                api_filters.append(f)
+            elif isinstance(f, Predicate):
+                predicates.append(f)
+            else:
+                predicates.append(where(f))
+
+        if album_id is not None:
+            predicates = _client_filters(api_filters, exclude) + predicates
+            source = self.search_album(album_id, prefetch, fields=fields)
+        elif api_filters or exclude:
+            api_filters, others = _one_per_group(api_filters)
+            predicates = _client_filters(others, None) + predicates
+            source = self.search(
+                api_filters, exclude, prefetch, fields=fields)
+        else:
+            source = self.list(prefetch, fields=fields)
+
+        predicate = all_of(*predicates) if predicates else None
+        transform = MediaRecord.from_api if as_records else None
+        return _run_query(source, predicate, limit, transform)
+
+    def search_plan(self, expression, exclude=None):
+        """
+        Returns the filters of the search requests answering
+        the expression (see search_any())
+
+        Returns
+        -------
+        [dict]:
+            Filters of each search request body
+        """
+        return [self._search_filters(filters, exclude)
+                for filters in _plan(expression)]
+
+    def search_any(self,
+                   expression,
+                   exclude=None,
+                   workers=4,
+                   fields=None,
+                   as_records=False):
+        """
+        Iterator over the media matching a boolean expression of filters,
+        searched with as few concurrent requests as possible.
+
+        Parameters
+        ----------
+        expression: Or, And, Val or [Val]
+            Expression of API filters (see gphotospy.query.Or),
+            a list is the same as an And
+        exclude: CONTENTFILTER or [CONTENTFILTER], optional
+            Content categories to be excluded from all the results
+        workers: int, optional
+            Number of searches run concurrently (default 4)
+        fields: str or [str], optional
+            Fields of each media to be returned (see list()).
+            They must include "id"
+        as_records: bool, optional
+            If True yields MediaRecord objects instead of dicts
+            (default False)
 
-        return self._get_all_media_items({ "filters": search_filter })
+        Yields
+        ------
+        Iterator over the media matching the expression, each one only
+        once, as soon as its page arrives
 
-    def search_album(self, album_id: str):
+        Raise
+        -----
+        QueryError
+            If the expression cannot be searched: the API ORs the date
+            filters and the content filters of a request, so two of them
+            cannot be ANDed
+
+        Notes
+        -----
+        The expression is put in disjunctive normal form, then the terms
+        differing only by dates (up to 5) or by content categories
+        (up to 10) are merged, as the API ORs them in a single request.
+        The remaining requests are paged concurrently.
+
+        Examples
+        --------
+        Pets or food, in 2019 or 2021: a single search request
+
+        >>> from gphotospy.query import Or, And
+        >>> expression = And(
+        ...     Or(CONTENTFILTER.PETS, CONTENTFILTER.FOOD),
+        ...     Or(date(2019), date(2021)))
+        >>> len(media_manager.search_plan(expression))
+        1
+
+        Favorite videos, or any photo of 2020: two requests
+
+        >>> expression = Or(And(MEDIAFILTER.VIDEO, FEATUREFILTER.FAVORITES),
+        ...                 And(MEDIAFILTER.PHOTO, date(2020)))
+        >>> media_iterator = media_manager.search_any(expression)
+        """
+        plan = self.search_plan(expression, exclude)
+        mask = fields_mask("mediaItems", fields)
+        transform = MediaRecord.from_api if as_records else None
+
+        def fetch(search_filter, page_token):
+            request_body = {
+                "filters": search_filter,
+                "pageSize": self._SEARCH_PAGESIZE,
+                "pageToken": page_token
+            }
+            result = execute(self._service.mediaItems().search(
+                body=request_body, fields=mask))
+            return (search_filter, result.get("mediaItems") or [],
+                    result.get("nextPageToken", None))
+
+        seen = set()
+        with ContextThreadPoolExecutor(
+                max_workers=max(workers, 1)) as executor:
+            pending = set(executor.submit(fetch, f, "") for f in plan)
+            try:
+                while pending:
+                    done, pending = wait(
+                        pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        search_filter, items, page_token = future.result()
+                        if page_token is not None:
+                            pending.add(executor.submit(
+                                fetch, search_filter, page_token))
+                        for media in items:
+                            if media["id"] in seen:
+                                continue
+                            seen.add(media["id"])
+                            yield media if transform is None \
+                                else transform(media)
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def search_album(self,
+                     album_id: str,
+                     prefetch=0,
+                     resume_from=None,
+                     fields=None,
+                     as_records=False):
         """
         Specialized search in album, no other filter can apply.
 
@@ -927,10 +2434,25 @@ class Media:
         ----------
         album_id: str
             Id of the album containing the media sought
+        prefetch: int, optional
+            Number of pages to fetch ahead on a background thread,
+            while the current page is consumed (default 0, no prefetch)
+        resume_from: dict, optional
+            Checkpoint of a previous walk over the same album, as returned
+            by the checkpoint() method of the iterator: the walk continues
+            from the item following the checkpoint
+        fields: str or [str], optional
+            Fields of each media to be returned, in the partial response
+            format of the API, such as "id,mediaMetadata/creationTime"
+            (default None, all the fields)
+        as_records: bool, optional
+            If True yields MediaRecord objects instead of dicts
+            (default False)
 
         Yields
         ------
-        Iterator over the list of media present in the album
+        Iterator over the list of media present in the album.
+        The iterator has a checkpoint() method (see list())
 
         Examples
         --------
@@ -946,4 +2468,6 @@ class Media:
         >>> search_iterator = media_manager.search_album(album_id)
         >>> next(search_iterator)
         """
-        return self._get_all_media_items({ "albumId": album_id })
+        return self._get_all_media_items(
+            {"albumId": album_id}, prefetch, resume_from, fields,
+            as_records)
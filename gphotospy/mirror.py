@@ -0,0 +1,362 @@
+import json
+import time
+import sqlite3
+import datetime
+import threading
+
+from .media import date, date_range
+from .utils import Paginator
+
+# Rows written to the database per transaction
+_WRITE_BATCH = 500
+# Query of the checkpoints of the walks over the mirror
+MIRROR_QUERY = {"mirror": "list"}
+
+
+def _parse_fields(fields):
+    """
+    Tree of a partial response mask, as in the API: paths and nested
+    selections, such as "id,mediaMetadata/width,mediaMetadata(photo(*))".
+    Returns a dict of field -> subtree (None for the whole field)
+    """
+    if not isinstance(fields, str):
+        fields = ",".join(fields)
+    tree = {}
+    stack = [tree]
+    nodes = []
+    token = ""
+
+    def close_token():
+        # "a/b/c" selects c inside b inside a
+        node = stack[-1]
+        keys = [k.strip() for k in token.split("/") if k.strip()]
+        for key in keys[:-1]:
+            child = node.get(key)
+            if child is None:
+                child = node[key] = {}
+            node = child
+        return node, keys[-1] if keys else None
+
+    for char in fields:
+        if char == "(":
+            node, key = close_token()
+            child = node.get(key)
+            if child is None:
+                child = node[key] = {}
+            stack.append(child)
+            token = ""
+        elif char in ",)":
+            node, key = close_token()
+            if key is not None and key not in node:
+                node[key] = None
+            token = ""
+            if char == ")":
+                stack.pop()
+        else:
+            token += char
+    node, key = close_token()
+    if key is not None and key not in node:
+        node[key] = None
+    return tree
+
+
+def _select(value, tree):
+    """ Copy of value with only the fields of tree (see _parse_fields()) """
+    if tree is None or "*" in tree:
+        return value
+    if isinstance(value, list):
+        return [_select(v, tree) for v in value]
+    if not isinstance(value, dict):
+        return value
+    return {key: _select(value[key], subtree)
+            for key, subtree in tree.items() if key in value}
+
+
+def _search_since(media_manager, first, prefetch):
+    """ Media created from the day first on, newest first """
+    last = datetime.date.today() + datetime.timedelta(days=1)
+    return media_manager.search(
+        date_range(
+            date(first.year, first.month, first.day),
+            date(last.year, last.month, last.day)),
+        prefetch=prefetch)
+
+
+class Mirror:
+    """
+    Local mirror of the library metadata, kept in a SQLite database.
+
+    The mirror holds the media items and the album memberships, and is
+    refreshed incrementally: only the media created since the last
+    refresh are fetched again.
+
+    Notes
+    -----
+    The baseUrl of a media item expires after about an hour, so the
+    media answered by the mirror must be fetched again from the API
+    before downloading them.
+
+    Both populate() and refresh() fetch the media with Media.search()
+    and a date range, so the mirror holds the media that search()
+    finds: it follows show_archived() and show_only_created().
+    An incremental refresh fetches the media by creation time: media
+    uploaded meanwhile but created (shot) before the last refresh are
+    found only by a full populate().
+
+    Examples
+    --------
+    Imports
+
+    >>> from gphotospy.mirror import Mirror
+
+    Populate the mirror once, then keep it up to date
+
+    >>> mirror = Mirror('library.db')
+    >>> mirror.populate(media_manager)
+    >>> mirror.refresh(media_manager)
+
+    Let the media manager answer from the mirror, if refreshed
+    within the last hour
+
+    >>> media_manager.set_mirror(mirror, max_staleness=3600)
+    >>> media_manager.get(media_id)
+    """
+
+    def __init__(self, path):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        path: Path
+            SQLite database file, created if it does not exist
+        """
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS media ("
+                "id TEXT PRIMARY KEY, creation_time TEXT, data TEXT, "
+                "synced_at REAL)")
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS media_creation_time "
+                "ON media (creation_time, id)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS album_media ("
+                "album_id TEXT, media_id TEXT, position INTEGER, "
+                "PRIMARY KEY (album_id, media_id))")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS meta ("
+                "key TEXT PRIMARY KEY, value TEXT)")
+
+    def close(self):
+        """ Closes the database """
+        with self._lock:
+            self._db.close()
+
+    # META
+    def _get_meta(self, key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def _set_meta(self, key, value):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    def watermark(self):
+        """ Creation time of the newest media in the mirror, or None """
+        return self._get_meta("watermark")
+
+    def age(self):
+        """ Seconds since the last refresh, or None if never refreshed """
+        refreshed_at = self._get_meta("refreshed_at")
+        if refreshed_at is None:
+            return None
+        return time.time() - float(refreshed_at)
+
+    def is_fresh(self, max_staleness):
+        """ True if refreshed within the last max_staleness seconds """
+        age = self.age()
+        return age is not None and age <= max_staleness
+
+    # WRITE
+    def _store(self, media_iterator, album_id=None):
+        """ Stores the media, returns the newest creation time seen """
+        newest = None
+        rows = []
+        position = 0
+        synced_at = time.time()
+
+        def flush():
+            with self._lock, self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?)",
+                    [row[:3] + (synced_at, ) for row in rows])
+                if album_id is not None:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO album_media "
+                        "VALUES (?, ?, ?)",
+                        [(album_id, row[0], row[3]) for row in rows])
+
+        for media in media_iterator:
+            creation_time = media.get(
+                "mediaMetadata", {}).get("creationTime", "")
+            if newest is None or creation_time > newest:
+                newest = creation_time
+            rows.append(
+                (media["id"], creation_time, json.dumps(media), position))
+            position += 1
+            if len(rows) == _WRITE_BATCH:
+                flush()
+                rows = []
+        if rows:
+            flush()
+        return newest
+
+    def _advance(self, newest):
+        watermark = self.watermark()
+        if newest is not None and (watermark is None or newest > watermark):
+            self._set_meta("watermark", newest)
+        self._set_meta("refreshed_at", str(time.time()))
+
+    def populate(self, media_manager, prefetch=2):
+        """
+        Mirrors all the media of the library, searching the whole
+        timeline. Media no longer in the library are removed from
+        the mirror.
+
+        Parameters
+        ----------
+        media_manager: Media
+            Media manager used to fetch the media
+        prefetch: int, optional
+            Pages fetched ahead while storing the current one (default 2)
+        """
+        started_at = time.time()
+        newest = self._store(_search_since(
+            media_manager, media_manager._TIMELINE_START, prefetch))
+        with self._lock, self._db:
+            self._db.execute(
+                "DELETE FROM media WHERE synced_at < ?", (started_at,))
+            self._db.execute(
+                "DELETE FROM album_media WHERE media_id NOT IN "
+                "(SELECT id FROM media)")
+        self._advance(newest)
+
+    def refresh(self, media_manager, prefetch=2):
+        """
+        Mirrors only the media created since the last refresh
+        (from the day of the watermark on). The first time it
+        populates the whole mirror.
+
+        Parameters
+        ----------
+        media_manager: Media
+            Media manager used to fetch the media
+        prefetch: int, optional
+            Pages fetched ahead while storing the current one (default 2)
+        """
+        watermark = self.watermark()
+        if watermark is None:
+            return self.populate(media_manager, prefetch)
+        first = datetime.date.fromisoformat(watermark[:10])
+        self._advance(self._store(
+            _search_since(media_manager, first, prefetch)))
+
+    def sync_album(self, media_manager, album_id: str, prefetch=2):
+        """
+        Mirrors the media of an album and its membership
+
+        Parameters
+        ----------
+        media_manager: Media
+            Media manager used to fetch the media
+        album_id: str
+            Id of the album to mirror
+        prefetch: int, optional
+            Pages fetched ahead while storing the current one (default 2)
+        """
+        media_iterator = media_manager.search_album(album_id, prefetch)
+        with self._lock, self._db:
+            self._db.execute(
+                "DELETE FROM album_media WHERE album_id = ?", (album_id,))
+        self._store(media_iterator, album_id)
+
+    # READ
+    def get(self, id: str):
+        """ Returns the mirrored media with the given id, or None """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM media WHERE id = ?", (id,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def count(self):
+        """ Number of media in the mirror """
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM media").fetchone()[0]
+
+    def list(self,
+             prefetch=0,
+             resume_from=None,
+             fields=None,
+             transform=None):
+        """
+        Iterator over the mirrored media, newest first,
+        as returned by Media.list()
+
+        Parameters
+        ----------
+        prefetch: int, optional
+            Pages read ahead on a background thread (default 0)
+        resume_from: dict, optional
+            Checkpoint of a previous walk over the mirror
+        fields: str or [str], optional
+            Fields of each media to be returned, in the partial response
+            format of the API, as in Media.list() (default None, all)
+        transform: callable, optional
+            Applied to each media yielded, such as MediaRecord.from_api
+
+        Yields
+        -------
+        Iterator over the media, with a checkpoint() method
+        as the one of Media.list()
+        """
+        query = ("SELECT creation_time, id, data FROM media "
+                 "WHERE (creation_time, id) < (?, ?) "
+                 "ORDER BY creation_time DESC, id DESC LIMIT ?")
+
+        tree = None if fields is None else _parse_fields(fields)
+
+        def fetch_page(page_token):
+            # Keyset pagination: the page token is the (creation time, id)
+            # of the last media of the previous page, and no cursor is
+            # kept open between pages
+            last = tuple(json.loads(page_token)) if page_token \
+                else ("\uffff", "")
+            with self._lock:
+                rows = self._db.execute(
+                    query, last + (_WRITE_BATCH,)).fetchall()
+            media = [json.loads(row[2]) for row in rows]
+            if tree is not None:
+                media = [_select(m, tree) for m in media]
+            result = {"mediaItems": media}
+            if len(rows) == _WRITE_BATCH:
+                result["nextPageToken"] = json.dumps(
+                    [rows[-1][0], rows[-1][1]])
+            return result
+        return Paginator(fetch_page, "mediaItems", prefetch,
+                         MIRROR_QUERY, resume_from, transform)
+
+    def album(self, album_id: str):
+        """ Iterator over the mirrored media of an album, in album order """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT media.data FROM album_media JOIN media "
+                "ON media.id = album_media.media_id "
+                "WHERE album_media.album_id = ? "
+                "ORDER BY album_media.position", (album_id,)).fetchall()
+        for row in rows:
+            yield json.loads(row[0])
@@ -0,0 +1,208 @@
+import re
+import fnmatch
+import datetime
+
+from .utils import epoch_seconds
+
+
+class Predicate:
+    """
+    Client-side condition on a media dict, to be used in Media.query().
+
+    Predicates are built by the functions of this module, and combined
+    with & (and), | (or) and ~ (not). The values of a predicate (patterns,
+    bounds) are compiled once, when it is built; combinations evaluate
+    their terms in order and stop at the first one that decides.
+
+    Examples
+    --------
+    Imports
+
+    >>> from gphotospy.query import filename, mime_type, width, camera
+
+    Large JPEGs or anything shot with a Pixel
+
+    >>> predicate = ((mime_type("image/jpeg") & width(min=3000))
+    ...              | camera(make="Google"))
+    >>> predicate(media)
+    True
+    """
+
+    def __init__(self, test):
+        """ test(media) -> bool """
+        self._test = test
+
+    def __call__(self, media):
+        return self._test(media)
+
+    def __and__(self, other):
+        return _AllOf(self, other)
+
+    def __or__(self, other):
+        return _AnyOf(self, other)
+
+    def __invert__(self):
+        test = self._test
+        return Predicate(lambda media: not test(media))
+
+
+class _AllOf(Predicate):
+    def __init__(self, *predicates):
+        # Flatten a & b & c into a single all()
+        self.predicates = []
+        for p in predicates:
+            if isinstance(p, _AllOf):
+                self.predicates.extend(p.predicates)
+            else:
+                self.predicates.append(p)
+        tests = tuple(p._test for p in self.predicates)
+        super().__init__(lambda media: all(t(media) for t in tests))
+
+
+class _AnyOf(Predicate):
+    def __init__(self, *predicates):
+        self.predicates = []
+        for p in predicates:
+            if isinstance(p, _AnyOf):
+                self.predicates.extend(p.predicates)
+            else:
+                self.predicates.append(p)
+        tests = tuple(p._test for p in self.predicates)
+        super().__init__(lambda media: any(t(media) for t in tests))
+
+
+def all_of(*predicates):
+    """ Predicate true if all the predicates are true """
+    return _AllOf(*predicates)
+
+
+def any_of(*predicates):
+    """ Predicate true if any of the predicates is true """
+    return _AnyOf(*predicates)
+
+
+def where(test):
+    """ Predicate from any function test(media) -> bool """
+    return Predicate(test)
+
+
+def _metadata(media):
+    return media.get("mediaMetadata", {})
+
+
+def filename(*patterns, case_sensitive=False):
+    """
+    Filename matching any of the shell-style patterns, such as "IMG_*.jpg"
+    (case insensitive by default)
+    """
+    flags = 0 if case_sensitive else re.IGNORECASE
+    regex = re.compile(
+        "|".join(fnmatch.translate(p) for p in patterns), flags)
+    return Predicate(lambda media: regex.match(
+        media.get("filename", "")) is not None)
+
+
+def filename_regex(pattern, flags=0):
+    """ Filename containing a match of the regular expression """
+    regex = re.compile(pattern, flags)
+    return Predicate(lambda media: regex.search(
+        media.get("filename", "")) is not None)
+
+
+def mime_type(*patterns):
+    """ Mime type matching any of the patterns, such as "image/*" """
+    regex = re.compile("|".join(fnmatch.translate(p) for p in patterns))
+    return Predicate(lambda media: regex.match(
+        media.get("mimeType", "")) is not None)
+
+
+def _bounds(key, min, max):
+    def test(media):
+        value = int(_metadata(media).get(key, 0))
+        return ((min is None or value >= min)
+                and (max is None or value <= max))
+    return Predicate(test)
+
+
+def width(min=None, max=None):
+    """ Width (pixels) within min and max, both included """
+    return _bounds("width", min, max)
+
+
+def height(min=None, max=None):
+    """ Height (pixels) within min and max, both included """
+    return _bounds("height", min, max)
+
+
+def camera(make=None, model=None):
+    """
+    Camera make and/or model equal to the given ones (case insensitive),
+    for both photos and videos
+    """
+    make = None if make is None else make.lower()
+    model = None if model is None else model.lower()
+
+    def test(media):
+        metadata = _metadata(media)
+        details = metadata.get("photo") or metadata.get("video") or {}
+        return ((make is None
+                 or details.get("cameraMake", "").lower() == make)
+                and (model is None
+                     or details.get("cameraModel", "").lower() == model))
+    return Predicate(test)
+
+
+def _as_epoch(moment):
+    if isinstance(moment, datetime.datetime):
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=datetime.timezone.utc)
+        return int(moment.timestamp())
+    if isinstance(moment, datetime.date):
+        return _as_epoch(datetime.datetime(
+            moment.year, moment.month, moment.day))
+    return int(moment)
+
+
+def created(after=None, before=None):
+    """
+    Creation time at or after after, and before before.
+    Both are datetime (naive ones are UTC), date or epoch seconds.
+    Finer than the date filters of the API, which work on whole days.
+    """
+    after = None if after is None else _as_epoch(after)
+    before = None if before is None else _as_epoch(before)
+
+    def test(media):
+        moment = epoch_seconds(_metadata(media).get("creationTime"))
+        return ((after is None or moment >= after)
+                and (before is None or moment < before))
+    return Predicate(test)
+
+
+class Or:
+    """
+    Any of the terms: API filters (date(), date_range(), CONTENTFILTER,
+    MEDIAFILTER, FEATUREFILTER) or nested Or/And, for Media.search_any()
+
+    Examples
+    --------
+    Pets or food, in 2019 or 2021
+
+    >>> from gphotospy.query import Or, And
+    >>> expression = And(Or(CONTENTFILTER.PETS, CONTENTFILTER.FOOD),
+    ...                  Or(year_2019, year_2021))
+    >>> media_iterator = media_manager.search_any(expression)
+    """
+
+    def __init__(self, *terms):
+        self.terms = terms
+
+
+class And:
+    """
+    All of the terms: API filters or nested Or/And,
+    for Media.search_any() (see Or)
+    """
+
+    def __init__(self, *terms):
+        self.terms = terms
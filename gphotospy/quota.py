@@ -0,0 +1,259 @@
+import time
+import sqlite3
+import datetime
+import threading
+import contextvars
+from contextlib import contextmanager
+
+try:
+    from zoneinfo import ZoneInfo
+    PACIFIC = ZoneInfo("America/Los_Angeles")
+except Exception:  # Python < 3.9, or no time zone database
+    PACIFIC = datetime.timezone(datetime.timedelta(hours=-8))
+
+# Request categories
+API = "api"
+MEDIA = "media"
+# Daily requests per project: all the API requests, and the requests
+# of media bytes through the baseUrls
+DAILY_LIMITS = {API: 10000, MEDIA: 75000}
+
+# Priorities
+HIGH = 0
+LOW = 1
+# Fraction of each daily limit kept for HIGH priority requests
+RESERVE = 0.2
+# LOW priority requests allowed ahead of their even pace over the day
+LOW_BURST = 100
+
+_DAY = 24 * 60 * 60
+
+_priority = contextvars.ContextVar("gphotospy_priority", default=HIGH)
+
+
+class QuotaExceeded(Exception):
+    """Exception raised when the daily quota of a category is used up"""
+
+    def __init__(self, msg=""):
+        self.msg = msg
+
+    def __str__(self):
+        return(repr(self.msg))
+
+
+class QuotaDeferred(QuotaExceeded):
+    """Exception raised when a LOW priority request must wait"""
+
+    def __init__(self, msg="", wait=0):
+        super().__init__(msg)
+        self.wait = wait
+
+
+def _quota_clock():
+    """ Returns the quota day, and the fraction of it elapsed """
+    now = datetime.datetime.now(PACIFIC)
+    elapsed = now.hour * 3600 + now.minute * 60 + now.second
+    return now.date().isoformat(), elapsed / _DAY
+
+
+@contextmanager
+def priority(level):
+    """
+    Context in which the requests (of this thread, and of the pages it
+    prefetches and the workers it starts) have the given priority
+
+    Examples
+    --------
+    >>> from gphotospy import quota
+    >>> with quota.priority(quota.LOW):
+    ...     mirror.refresh(media_manager)
+    """
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority():
+    """ Priority of the requests made now """
+    return _priority.get()
+
+
+class QuotaAccountant:
+    """
+    Counts the requests of each category for the current quota day
+    (which starts at midnight Pacific time), in a SQLite database
+    shared by all the processes using the same project.
+
+    HIGH priority requests may use the whole daily limit. LOW priority
+    requests may use it except the reserve, and are spread evenly over
+    the day: a LOW request ahead of its pace is deferred, either
+    raising QuotaDeferred or waiting its turn (wait_low=True).
+
+    Examples
+    --------
+    Imports
+
+    >>> from gphotospy import quota
+
+    Count all the requests of this process
+
+    >>> quota.set_accountant(quota.QuotaAccountant('quota.db'))
+    >>> quota.get_accountant().remaining(quota.API)
+    9874
+
+    Refresh the mirror in the background, without starving the uploads
+
+    >>> with quota.priority(quota.LOW):
+    ...     mirror.refresh(media_manager)
+    """
+
+    def __init__(self,
+                 path,
+                 limits=None,
+                 reserve=RESERVE,
+                 low_burst=LOW_BURST,
+                 wait_low=False):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        path: Path
+            SQLite database file, created if it does not exist
+        limits: dict, optional
+            Daily limit of each category (default DAILY_LIMITS)
+        reserve: float, optional
+            Fraction of each limit kept for HIGH priority (default 0.2)
+        low_burst: int, optional
+            LOW priority requests allowed ahead of their pace
+            (default 100)
+        wait_low: bool, optional
+            If True a deferred LOW priority request waits, instead of
+            raising QuotaDeferred (default False)
+        """
+        self.limits = dict(DAILY_LIMITS if limits is None else limits)
+        self.reserve = reserve
+        self.low_burst = low_burst
+        self.wait_low = wait_low
+        self._lock = threading.Lock()
+        # Transactions are explicit (BEGIN IMMEDIATE), so that the check
+        # and the count are atomic across processes
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS usage ("
+            "day TEXT, category TEXT, priority INTEGER, count INTEGER, "
+            "PRIMARY KEY (day, category, priority))")
+
+    def close(self):
+        """ Closes the database """
+        with self._lock:
+            self._db.close()
+
+    def _counts(self, day, category):
+        rows = self._db.execute(
+            "SELECT priority, count FROM usage "
+            "WHERE day = ? AND category = ?", (day, category)).fetchall()
+        return dict(rows)
+
+    def used(self, category, priority=None):
+        """ Requests of the category today, of the priority or of all """
+        day, _ = _quota_clock()
+        with self._lock:
+            counts = self._counts(day, category)
+        if priority is not None:
+            return counts.get(priority, 0)
+        return sum(counts.values())
+
+    def remaining(self, category):
+        """ Requests of the category still available today """
+        return max(self.limits[category] - self.used(category), 0)
+
+    def _try_acquire(self, category, n, priority):
+        """ Counts the requests, or returns the seconds to wait """
+        limit = self.limits.get(category)
+        day, elapsed = _quota_clock()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                counts = self._counts(day, category)
+                total = sum(counts.values())
+                if limit is not None and total + n > limit:
+                    raise QuotaExceeded(
+                        "daily {} quota used up".format(category))
+                if limit is not None and priority == LOW:
+                    low_budget = limit * (1 - self.reserve)
+                    if total + n > low_budget:
+                        # Only the reserve is left: until tomorrow
+                        self._db.execute("ROLLBACK")
+                        return (1 - elapsed) * _DAY
+                    low = counts.get(LOW, 0) + n - self.low_burst
+                    if low > low_budget * elapsed:
+                        self._db.execute("ROLLBACK")
+                        return (low / low_budget - elapsed) * _DAY
+                self._db.execute(
+                    "INSERT INTO usage VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (day, category, priority) "
+                    "DO UPDATE SET count = count + excluded.count",
+                    (day, category, priority, n))
+                self._db.execute("DELETE FROM usage WHERE day < ?", (day,))
+                self._db.execute("COMMIT")
+                return None
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def acquire(self, category, n=1, priority=None):
+        """
+        Counts n requests of the category, about to be sent
+
+        Parameters
+        ----------
+        category: str
+            API or MEDIA
+        n: int, optional
+            Number of requests (default 1)
+        priority: int, optional
+            HIGH or LOW (default current_priority())
+
+        Raise
+        -----
+        QuotaExceeded
+            If the daily limit is used up
+        QuotaDeferred
+            If a LOW priority request must wait, and wait_low is False
+        """
+        if priority is None:
+            priority = current_priority()
+        while True:
+            wait = self._try_acquire(category, n, priority)
+            if wait is None:
+                return
+            if not self.wait_low:
+                raise QuotaDeferred(
+                    "low priority {} requests deferred".format(category),
+                    wait)
+            time.sleep(min(max(wait, 0.1), 60))
+
+
+_accountant = None
+
+
+def set_accountant(accountant):
+    """ Sets the accountant of all the requests, None to disable """
+    global _accountant
+    _accountant = accountant
+
+
+def get_accountant():
+    """ Returns the accountant of all the requests, or None """
+    return _accountant
+
+
+def charge(category, n=1):
+    """ Counts n requests of the category with the accountant, if set """
+    accountant = _accountant
+    if accountant is not None:
+        accountant.acquire(category, n)
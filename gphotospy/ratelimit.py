@@ -0,0 +1,153 @@
+import time
+import random
+import sqlite3
+import threading
+
+from .quota import API
+
+
+class SharedRateLimiter:
+    """
+    Token bucket whose state is kept in a SQLite database, so that all
+    the processes using the same file share the same rate.
+
+    The bucket holds up to burst tokens and gains rate tokens per
+    second; each request takes a token, waiting for it if the bucket
+    is empty. The aggregate rate of all the processes stays at rate,
+    instead of each of them running into 429 errors.
+
+    Examples
+    --------
+    Imports
+
+    >>> from gphotospy import ratelimit
+
+    In each of the ingest workers: at most 8 API requests per second,
+    all the workers together
+
+    >>> limiter = ratelimit.SharedRateLimiter('/tmp/photos-rate.db', 8)
+    >>> ratelimit.set_limiter(limiter)
+    >>> media_manager.stage_many(files)
+    """
+
+    def __init__(self, path, rate, burst=None, name="default"):
+        """
+        Constructor
+
+        Parameters
+        ----------
+        path: Path
+            SQLite database file, created if it does not exist
+        rate: float
+            Tokens per second
+        burst: float, optional
+            Maximum tokens in the bucket (default rate, one second)
+        name: str, optional
+            Name of the bucket, so that a file can hold many of them
+        """
+        self.rate = rate
+        self.burst = rate if burst is None else burst
+        self.name = name
+        self._lock = threading.Lock()
+        # Transactions are explicit (BEGIN IMMEDIATE), so that reading
+        # and taking the tokens is atomic across processes
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "name TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+        self._db.execute(
+            "INSERT OR IGNORE INTO buckets VALUES (?, ?, ?)",
+            (name, self.burst, time.time()))
+
+    def close(self):
+        """ Closes the database """
+        with self._lock:
+            self._db.close()
+
+    def _take(self, n):
+        """ Takes n tokens, or returns the seconds to wait for them """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                tokens, updated = self._db.execute(
+                    "SELECT tokens, updated FROM buckets WHERE name = ?",
+                    (self.name,)).fetchone()
+                # Wall clock: it is the one shared by the processes
+                now = time.time()
+                tokens = min(self.burst,
+                             tokens + max(now - updated, 0) * self.rate)
+                wait = None
+                # More than burst tokens are taken on credit:
+                # the following requests wait for them
+                if tokens >= min(n, self.burst):
+                    tokens -= n
+                else:
+                    wait = (min(n, self.burst) - tokens) / self.rate
+                self._db.execute(
+                    "UPDATE buckets SET tokens = ?, updated = ? "
+                    "WHERE name = ?", (tokens, now, self.name))
+                self._db.execute("COMMIT")
+                return wait
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def try_acquire(self, n=1):
+        """ Takes n tokens if available now; returns True if taken """
+        return self._take(n) is None
+
+    def acquire(self, n=1, timeout=None):
+        """
+        Takes n tokens, waiting for them
+
+        Parameters
+        ----------
+        n: int, optional
+            Number of tokens (default 1)
+        timeout: float, optional
+            Maximum seconds to wait (default None, no limit)
+
+        Returns
+        -------
+        True if the tokens were taken, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._take(n)
+            if wait is None:
+                return True
+            if deadline is not None:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return False
+                wait = min(wait, left)
+            # Jitter, so that the waiting processes do not wake together
+            time.sleep(wait * random.uniform(1, 1.2))
+
+
+_limiters = {}
+
+
+def set_limiter(limiter, category=API):
+    """
+    Sets the limiter of all the requests of the category
+    (quota.API or quota.MEDIA), None to disable
+    """
+    if limiter is None:
+        _limiters.pop(category, None)
+    else:
+        _limiters[category] = limiter
+
+
+def get_limiter(category=API):
+    """ Returns the limiter of the category, or None """
+    return _limiters.get(category)
+
+
+def throttle(category, n=1):
+    """ Waits for n tokens of the limiter of the category, if set """
+    limiter = _limiters.get(category)
+    if limiter is not None:
+        limiter.acquire(n)
+
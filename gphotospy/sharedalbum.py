@@ -1,3 +1,7 @@
+from .utils import fields_mask, Paginator
+from .executor import execute
+
+
 class SharedAlbum:
     """
     Shared album manager
@@ -104,7 +108,7 @@ class SharedAlbum:
         >>> sharing_manager.get(token)
         {'id': '...', 'title': 'test shared album', 'productUrl': 'https://photos.google.com/lr/album/...', 'isWriteable': True, 'shareInfo': {'sharedAlbumOptions': {'isCommentable': True}, 'shareableUrl': 'https://photos.app.goo.gl/...', 'shareToken': '...', 'isJoined': True, 'isOwned': True}}
         """
-        return self._service.sharedAlbums().get(shareToken=token).execute()
+        return execute(self._service.sharedAlbums().get(shareToken=token))
 
     def join(self, token: str):
         """
@@ -127,7 +131,8 @@ class SharedAlbum:
         request_body = {
             "shareToken": token
         }
-        return self._service.sharedAlbums().join(body=request_body).execute()
+        return execute(
+            self._service.sharedAlbums().join(body=request_body))
 
     def leave(self, token: str):
         """
@@ -145,9 +150,14 @@ class SharedAlbum:
         request_body = {
             "shareToken": token
         }
-        return self._service.sharedAlbums().leave(body=request_body).execute()
-
-    def list(self, show_only_created=_SHOW_ONLY_CREATED):
+        return execute(
+            self._service.sharedAlbums().leave(body=request_body))
+
+    def list(self,
+             show_only_created=_SHOW_ONLY_CREATED,
+             prefetch=0,
+             resume_from=None,
+             fields=None):
         """
         Iterator over the albums present in the Sharing tab
 
@@ -156,11 +166,24 @@ class SharedAlbum:
         show_only_created: bool, optional
             Set if it has to list only albums created via the API
             (default is set by show_only_created(), whose default is FALSE)
+        prefetch: int, optional
+            Number of pages to fetch ahead on a background thread,
+            while the current page is consumed (default 0, no prefetch)
+        resume_from: dict, optional
+            Checkpoint of a previous walk over the same list, as returned
+            by the checkpoint() method of the iterator: the walk continues
+            from the item following the checkpoint
+        fields: str or [str], optional
+            Fields of each album to be returned, in the partial response
+            format of the API, such as "id,title"
+            (default None, all the fields)
 
         yields
         ------
         iterator:
-            iteratore over the list of albums
+            iteratore over the list of albums. The iterator has a
+            checkpoint() method returning a JSON-serializable position
+            of the walk
 
         Notes
         -----
@@ -190,14 +213,14 @@ class SharedAlbum:
         >>> print(next(album_iterator))
         {'id': '...', 'title': 'Test sharing album', 'productUrl': 'https://photos.google.com/lr/album/...', 'mediaItemsCount': '0', 'coverPhotoBaseUrl': 'https://lh3.googleusercontent.com/lr/...', 'coverPhotoMediaItemId': '...'}
         """
-        page_token = ""
-        while page_token is not None:
-            result = self._service.sharedAlbums().list(
-                pageSize=self._PAGESIZE,
-                excludeNonAppCreatedData=show_only_created,
-                pageToken=page_token
-            ).execute()
-            page_token = result.get("nextPageToken", None)
-            curr_list = result.get("sharedAlbums")
-            for album in curr_list:
-                yield album
+        query = {
+            "pageSize": self._PAGESIZE,
+            "excludeNonAppCreatedData": show_only_created
+        }
+
+        mask = fields_mask("sharedAlbums", fields)
+
+        def fetch_page(page_token):
+            return execute(self._service.sharedAlbums().list(
+                pageToken=page_token, fields=mask, **query))
+        return Paginator(fetch_page, "sharedAlbums", prefetch, query, resume_from)
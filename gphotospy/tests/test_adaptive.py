@@ -0,0 +1,131 @@
+import time
+import random
+import threading
+import unittest
+
+from gphotospy import adaptive
+from gphotospy.adaptive import AdaptiveLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    def tearDown(self):
+        adaptive.disable()
+
+    def test_additive_increase(self):
+        limiter = AdaptiveLimiter(initial=2, max_limit=4)
+        for _ in range(20):
+            with limiter.slot():
+                pass
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_throttling_cuts_once_per_episode(self):
+        limiter = AdaptiveLimiter(initial=8)
+        started = [limiter.acquire() for _ in range(4)]
+        # Four transfers throttled together: a single cut
+        for s in started:
+            limiter.release(s, congested=True)
+        self.assertEqual(limiter.limit, 4)
+        limiter.release(limiter.acquire(), congested=True)
+        self.assertEqual(limiter.limit, 2)
+        for _ in range(5):
+            limiter.release(limiter.acquire(), congested=True)
+        self.assertEqual(limiter.limit, 1)
+
+    def test_observed_status(self):
+        limiter = AdaptiveLimiter(initial=8)
+        with limiter.slot():
+            adaptive.observe(200)
+        self.assertEqual(limiter.limit, 8)
+        with limiter.slot():
+            adaptive.observe(429)
+        self.assertEqual(limiter.limit, 4)
+        with limiter.slot():
+            adaptive.observe(503)
+        self.assertEqual(limiter.limit, 2)
+        # No transfer in progress: nothing to report
+        adaptive.observe(503)
+        self.assertEqual(limiter.limit, 2)
+
+    def test_error_cuts(self):
+        limiter = AdaptiveLimiter(initial=8)
+        with self.assertRaises(OSError):
+            with limiter.slot():
+                raise OSError("connection reset")
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_rising_latency_cuts(self):
+        limiter = AdaptiveLimiter(initial=8, max_limit=8)
+        for _ in range(3):
+            limiter.release(time.monotonic() - 0.01)
+        self.assertEqual(limiter.limit, 8)
+        limiter.release(time.monotonic() - 0.05)
+        self.assertEqual(limiter.limit, 4)
+
+    def test_latency_by_size(self):
+        limiter = AdaptiveLimiter(initial=8, max_limit=8)
+        limiter.release(time.monotonic() - 0.01, size=1000)
+        # Five times longer, for ten times the bytes
+        limiter.release(time.monotonic() - 0.05, size=10000)
+        self.assertEqual(limiter.limit, 8)
+        limiter.release(time.monotonic() - 0.05, size=900)
+        self.assertEqual(limiter.limit, 4)
+
+    def test_mixed_sizes_on_healthy_link(self):
+        clock = FakeClock()
+        self.addCleanup(setattr, adaptive, "time", adaptive.time)
+        adaptive.time = clock
+        limiter = AdaptiveLimiter(initial=4, max_limit=32)
+        rnd = random.Random(1)
+        for _ in range(2000):
+            size = int(50e3 * 400 ** rnd.random())
+            started = limiter.acquire()
+            # Fixed overhead, then 10 MB/s
+            clock.now += 0.2 + size / 10e6
+            limiter.release(started, size=size)
+        self.assertEqual(limiter.limit, 32)
+
+    def test_limit_bounds_concurrency(self):
+        limiter = AdaptiveLimiter(initial=3, max_limit=3)
+        peak = []
+        lock = threading.Lock()
+
+        def transfer():
+            with limiter.slot():
+                with lock:
+                    peak.append(limiter.in_flight)
+                time.sleep(0.02)
+
+        threads = [threading.Thread(target=transfer) for _ in range(12)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertLessEqual(max(peak), 3)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_module_slots(self):
+        # Disabled: the slot only carries the size
+        with adaptive.slot(adaptive.UPLOAD, 10) as transfer:
+            self.assertEqual(transfer.size, 10)
+        self.assertIsNone(adaptive.get_limiter(adaptive.UPLOAD))
+        adaptive.enable(adaptive.DOWNLOAD, initial=6)
+        self.assertIsNone(adaptive.get_limiter(adaptive.UPLOAD))
+        limiter = adaptive.get_limiter(adaptive.DOWNLOAD)
+        with adaptive.slot(adaptive.DOWNLOAD):
+            self.assertEqual(limiter.stats()["in_flight"], 1)
+            adaptive.observe(429)
+        self.assertEqual(limiter.stats()["limit"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
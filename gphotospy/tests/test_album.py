@@ -1,8 +1,129 @@
 import unittest
 
-from gphotospy.album import Album
+from gphotospy.album import Album, BatchMediaItemsError
+
+
+class FakeRequest:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        if self.result is None:
+            raise ValueError("request failed")
+        return self.result
+
+
+class FakeBatch:
+    def __init__(self, sent):
+        self.sent = sent
+        self.requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        self.requests.append((request_id, request, callback))
+
+    def execute(self):
+        self.sent.append(len(self.requests))
+        for request_id, request, callback in self.requests:
+            if request.result is None:
+                callback(request_id, None, ValueError("album not found"))
+            else:
+                callback(request_id, request.result, None)
+
+
+class FakeAlbums:
+    def __init__(self, service):
+        self.service = service
+
+    def batchAddMediaItems(self, albumId, body):
+        ids = body["mediaItemIds"]
+        if len(ids) > 50 or "bad" in ids:
+            return FakeRequest(None)
+        self.service.added.extend(ids)
+        return FakeRequest({})
+
+    def get(self, albumId):
+        if albumId == "missing":
+            return FakeRequest(None)
+        return FakeRequest({"id": albumId, "title": "title " + albumId})
+
+    def share(self, albumId, body):
+        return FakeRequest({"shareInfo": {"shareToken": "token-" + albumId}})
+
+
+class FakeService:
+    def __init__(self):
+        self.sent = []
+        self.added = []
+
+    def albums(self):
+        return FakeAlbums(self)
+
+    def new_batch_http_request(self):
+        return FakeBatch(self.sent)
 
 
 class TestAlbum(unittest.TestCase):
     def test_create_album(self):
         pass
+
+
+class TestAlbumBatch(unittest.TestCase):
+    def setUp(self):
+        self.service = FakeService()
+        self.album_manager = Album({"service": self.service,
+                                    "secrets": "secrets"})
+
+    def test_calls_are_batched(self):
+        ids = ["album{}".format(i) for i in range(120)]
+        with self.album_manager.batch():
+            futures = [self.album_manager.get(id) for id in ids]
+            shared = self.album_manager.share("album0")
+            missing = self.album_manager.get("missing")
+        self.assertEqual(self.service.sent, [50, 50, 22])
+        self.assertEqual([f.result()["id"] for f in futures], ids)
+        self.assertEqual(shared.result(), {"shareToken": "token-album0"})
+        with self.assertRaises(ValueError):
+            missing.result()
+        # Outside the context calls are executed at once
+        self.assertEqual(self.album_manager.get("album1")["id"], "album1")
+
+    def test_exception_cancels_pending_calls(self):
+        with self.assertRaises(KeyError):
+            with self.album_manager.batch(limit=10):
+                future = self.album_manager.get("album0")
+                raise KeyError("stop")
+        self.assertTrue(future.cancelled())
+        self.assertEqual(self.service.sent, [])
+
+
+class TestBatchAddMediaItems(unittest.TestCase):
+    def test_chunks_with_reports(self):
+        service = FakeService()
+        album_manager = Album({"service": service, "secrets": "secrets"})
+        ids = ["media{}".format(i) for i in range(230)]
+        ids[120] = "bad"
+        reports = album_manager.batchAddMediaItems(
+            "album", ids, workers=3, raise_errors=False)
+
+        self.assertEqual([len(r["media_item_ids"]) for r in reports],
+                         [50, 50, 50, 50, 30])
+        self.assertEqual([r["error"] is None for r in reports],
+                         [True, True, False, True, True])
+        self.assertEqual(sorted(service.added),
+                         sorted(ids[:100] + ids[150:]))
+
+    def test_failed_chunk_raises(self):
+        service = FakeService()
+        album_manager = Album({"service": service, "secrets": "secrets"})
+        ids = ["media{}".format(i) for i in range(120)]
+        ids[60] = "bad"
+        with self.assertRaises(BatchMediaItemsError) as raised:
+            album_manager.batchAddMediaItems("album", ids)
+        reports = raised.exception.reports
+        self.assertEqual([r["error"] is None for r in reports],
+                         [True, False, True])
+        self.assertIsInstance(raised.exception.__cause__, ValueError)
+        # The other chunks were sent anyway
+        self.assertEqual(len(service.added), 70)
+        self.assertEqual(len(album_manager.batchAddMediaItems(
+            "album", ids[:50])), 1)
@@ -0,0 +1,95 @@
+import os
+import pickle
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+
+from gphotospy import authorize
+from gphotospy.authorize import CredentialHttp, CredentialStore
+
+
+class FakeCredentials:
+    """ Picklable stand-in for google.oauth2 credentials """
+
+    def __init__(self, expires_in):
+        self.token = "token-0"
+        self.refresh_token = "refresh"
+        self.refreshes = 0
+        self.expiry = datetime.utcnow() + timedelta(seconds=expires_in)
+
+    @property
+    def valid(self):
+        return self.expiry > datetime.utcnow()
+
+    def refresh(self, request):
+        self.refreshes += 1
+        self.token = "token-{}".format(self.refreshes)
+        self.expiry = datetime.utcnow() + timedelta(hours=1)
+
+
+class TestCredentialStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.secrets = os.path.join(self.tmp.name, "secrets.json")
+        self.token_path = os.path.join(self.tmp.name, authorize.token_file)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_token(self, credentials):
+        with open(self.token_path, "wb") as f:
+            pickle.dump(credentials, f)
+
+    def test_loads_once_without_writing(self):
+        self.write_token(FakeCredentials(expires_in=3600))
+        store = CredentialStore()
+        first = store.get(self.secrets)
+        os.remove(self.token_path)
+        self.assertIs(store.get(self.secrets), first)
+        self.assertEqual(first.refreshes, 0)
+        self.assertFalse(os.path.exists(self.token_path))
+
+    def test_refreshes_once_near_expiry(self):
+        self.write_token(FakeCredentials(expires_in=3600))
+        store = CredentialStore()
+        credentials = store.get(self.secrets)
+        # About to expire: inside the refresh margin
+        credentials.expiry = datetime.utcnow() + timedelta(seconds=10)
+
+        threads = [threading.Thread(target=store.get, args=(self.secrets,))
+                   for _ in range(16)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(credentials.refreshes, 1)
+        with open(self.token_path, "rb") as f:
+            self.assertEqual(pickle.load(f).token, "token-1")
+
+    def test_forced_refresh_skips_stale_token(self):
+        self.write_token(FakeCredentials(expires_in=3600))
+        store = CredentialStore()
+        credentials = store.get(self.secrets)
+        store.refresh(self.secrets, "token-0")
+        store.refresh(self.secrets, "token-0")
+        self.assertEqual(credentials.refreshes, 1)
+
+
+class TestCredentialHttp(unittest.TestCase):
+    def test_http_per_thread_with_timeout(self):
+        transport = CredentialHttp("secrets.json")
+        http = transport._http()
+        self.assertIs(transport._http(), http)
+        self.assertEqual(http.timeout, 60)
+        # Resumable media answer 308, which must not be followed
+        self.assertNotIn(308, http.redirect_codes)
+        others = []
+        thread = threading.Thread(
+            target=lambda: others.append(transport._http()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(others[0], http)
+        self.assertEqual(CredentialHttp("secrets.json", timeout=5)
+                         ._http().timeout, 5)
@@ -0,0 +1,52 @@
+import unittest
+
+from gphotospy import columns
+from gphotospy.columns import Columns, COLUMN_FIELDS, MIME_CATEGORIES
+from gphotospy.media import Media
+from gphotospy.tests.test_media import FakeService, make_library
+
+VIDEO = {
+    "id": "video0",
+    "mimeType": "video/mp4",
+    "mediaMetadata": {
+        "creationTime": "2014-10-02T15:01:23.045123456Z",
+        "width": "1920",
+        "height": "1080",
+        "video": {"cameraMake": "Pixel", "cameraModel": "4a", "fps": 29.97}
+    }
+}
+
+
+class TestColumns(unittest.TestCase):
+    def test_to_columns(self):
+        library = make_library(120) + [VIDEO]
+        service = FakeService(library)
+        media_manager = Media({"service": service, "secrets": "secrets"})
+        result = media_manager.to_columns()
+
+        self.assertEqual(len(result), 121)
+        self.assertEqual(result.id, [m["id"] for m in library])
+        self.assertEqual(set(service.media_items.fields),
+                         {"nextPageToken,mediaItems({})".format(COLUMN_FIELDS)})
+        self.assertEqual(result.creation_time[-1], 1412262083)
+        self.assertEqual(result.fps[-1], 29.97)
+        self.assertEqual(result.camera_model[-1], "4a")
+        self.assertEqual(
+            [MIME_CATEGORIES[c] for c in result.mime_category[-2:]],
+            ["image", "video"])
+
+    def test_to_numpy_without_numpy(self):
+        saved = columns.numpy
+        columns.numpy = None
+        try:
+            with self.assertRaises(ImportError):
+                Columns().extend([VIDEO]).to_numpy()
+        finally:
+            columns.numpy = saved
+
+    @unittest.skipIf(columns.numpy is None, "NumPy not installed")
+    def test_to_numpy(self):
+        arrays = Columns().extend(make_library(10) + [VIDEO]).to_numpy()
+        self.assertEqual(arrays["creation_time"].dtype.itemsize, 8)
+        self.assertEqual(int(arrays["width"].sum()), 10 * 4000 + 1920)
+        self.assertEqual(arrays["id"][-1], "video0")
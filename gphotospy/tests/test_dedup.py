@@ -0,0 +1,105 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from gphotospy import dedup, media
+from gphotospy.dedup import UploadIndex
+from gphotospy.media import Media
+
+
+class TestUploadIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.index = UploadIndex(os.path.join(self.tmp, "uploads.db"))
+        self.files = []
+        for i in range(5):
+            path = os.path.join(self.tmp, "picture{}.jpg".format(i))
+            with open(path, "wb") as f:
+                f.write(os.urandom(1000 + i))
+            self.files.append(path)
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.tmp)
+
+    def test_hash_is_cached_until_file_changes(self):
+        hashes = self.index.hash_many(self.files, workers=3)
+        self.assertEqual(hashes[self.files[0]],
+                         dedup.file_hash(self.files[0]))
+
+        saved, dedup.file_hash = dedup.file_hash, None
+        try:
+            self.assertEqual(self.index.hash(self.files[0]),
+                             hashes[self.files[0]])
+        finally:
+            dedup.file_hash = saved
+
+        with open(self.files[0], "ab") as f:
+            f.write(b"more")
+        self.assertNotEqual(self.index.hash(self.files[0]),
+                            hashes[self.files[0]])
+
+    def test_moved_file_is_recognized(self):
+        self.index.record_upload(self.files[0], "token-0")
+        self.assertFalse(self.index.is_uploaded(self.files[0]))
+        self.index.record_created("token-0", "media-0")
+
+        moved = os.path.join(self.tmp, "renamed.jpg")
+        shutil.copy(self.files[0], moved)
+        self.assertTrue(self.index.is_uploaded(moved))
+        self.assertTrue(self.index.is_created("token-0"))
+        self.assertFalse(self.index.is_uploaded(self.files[1]))
+
+    def test_stage_many_skips_uploaded_files(self):
+        self.index.record_upload(self.files[2], "old-token")
+        self.index.record_created("old-token", "media-2")
+        saved = media.upload
+        media.upload = lambda secrets, media_file, **kwargs: "token"
+        try:
+            media_manager = Media({"service": None, "secrets": "secrets"})
+            media_manager.set_upload_index(self.index)
+            results = media_manager.stage_many(self.files, workers=2)
+        finally:
+            media.upload = saved
+
+        self.assertEqual([r["skipped"] for r in results],
+                         [False, False, True, False, False])
+        self.assertEqual(len(media_manager._staged_media), 4)
+
+    def test_same_content_in_one_run_is_uploaded_once(self):
+        copy = os.path.join(self.tmp, "copy.jpg")
+        shutil.copy(self.files[0], copy)
+        uploaded = []
+
+        def fake_upload(secrets, media_file, **kwargs):
+            uploaded.append(media_file)
+            return "token-{}".format(len(uploaded))
+
+        saved = media.upload
+        media.upload = fake_upload
+        try:
+            media_manager = Media({"service": None, "secrets": "secrets"})
+            media_manager.set_upload_index(self.index)
+            results = media_manager.stage_many(
+                [self.files[0], copy, self.files[1]], workers=3)
+        finally:
+            media.upload = saved
+
+        self.assertEqual(len(uploaded), 2)
+        self.assertEqual(sorted(r["skipped"] for r in results[:2]),
+                         [False, True])
+        self.assertFalse(results[2]["skipped"])
+        tokens = [m["simpleMediaItem"]["uploadToken"]
+                  for m in media_manager._staged_media]
+        self.assertEqual(len(set(tokens)), 2)
+
+    def test_failed_upload_releases_the_content(self):
+        copy = os.path.join(self.tmp, "copy.jpg")
+        shutil.copy(self.files[0], copy)
+        self.assertTrue(self.index.claim(self.files[0]))
+        self.assertFalse(self.index.claim(copy))
+        # The same file may claim again, e.g. on retry
+        self.assertTrue(self.index.claim(self.files[0]))
+        self.index.release(self.files[0])
+        self.assertTrue(self.index.claim(copy))
@@ -0,0 +1,107 @@
+import json
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+import httplib2
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+from googleapiclient.model import JsonModel
+
+from gphotospy import executor
+from gphotospy.executor import RequestExecutor
+
+
+class FakeApiServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the API: replies to the requests with the
+    scripted (status, headers) failures, then with 200 and {"ok": true}
+    """
+    daemon_threads = True
+
+    def __init__(self, failures=()):
+        super().__init__(("127.0.0.1", 0), FakeApiHandler)
+        self.failures = list(failures)
+        self.requests = 0
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{}".format(self.server_address[1])
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        server = self.server
+        server.requests += 1
+        status, headers = (200, {})
+        if server.failures:
+            status, headers = server.failures.pop(0)
+        body = json.dumps({"ok": True} if status == 200 else {
+            "error": {"code": status, "message": "injected"}}).encode()
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _reply
+    do_POST = _reply
+
+
+class TestRequestExecutor(unittest.TestCase):
+    def setUp(self):
+        self.executor = RequestExecutor(backoff=0, max_backoff=0.1)
+
+    def start(self, failures):
+        server = FakeApiServer(failures)
+        Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def request(self, server, method, method_id):
+        return HttpRequest(
+            httplib2.Http(), JsonModel().response,
+            server.url + "/v1/" + method_id, method=method,
+            body="{}" if method == "POST" else None,
+            headers={"content-type": "application/json"},
+            methodId=method_id)
+
+    def test_idempotent_requests_are_retried(self):
+        server = self.start([(503, {}), (500, {}), (429, {})])
+        result = self.executor.execute(self.request(
+            server, "GET", "photoslibrary.mediaItems.list"))
+        self.assertEqual(result, {"ok": True})
+        self.assertEqual(server.requests, 4)
+
+    def test_batch_create_is_never_blindly_retried(self):
+        server = self.start([(429, {"Retry-After": "0"}), (503, {})])
+        with self.assertRaises(HttpError):
+            self.executor.execute(self.request(
+                server, "POST", "photoslibrary.mediaItems.batchCreate"))
+        # Retried after the 429, not after the 503
+        self.assertEqual(server.requests, 2)
+
+    def test_retry_budget(self):
+        server = self.start([(503, {})] * 4)
+        limited = RequestExecutor(backoff=0, budget=2, ratio=0)
+        with self.assertRaises(HttpError):
+            limited.execute(self.request(
+                server, "POST", "photoslibrary.mediaItems.search"))
+        self.assertEqual(server.requests, 3)
+        self.assertLess(limited.remaining_budget(), 1)
+
+    def test_retry_after(self):
+        error = HttpError(httplib2.Response(
+            {"status": 429, "retry-after": "7"}), b"")
+        self.assertEqual(self.executor.delay(error, 0), 0.1)
+        self.assertEqual(RequestExecutor().delay(error, 0), 7)
+        self.assertTrue(executor.is_retryable(error, idempotent=False))
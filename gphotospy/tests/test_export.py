@@ -0,0 +1,73 @@
+import os
+import csv
+import gzip
+import json
+import shutil
+import tempfile
+import unittest
+
+from gphotospy.export import export, ALBUM_COLUMNS
+from gphotospy.media import Media
+from gphotospy.tests.test_media import FakeService, make_library
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.library = make_library(250)
+        self.media_manager = Media({"service": FakeService(self.library),
+                                    "secrets": "secrets"})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_ndjson_gzip_rotation(self):
+        path = os.path.join(self.tmp, "media.ndjson.gz")
+        files = export(self.media_manager.list(), path, max_rows=100)
+        self.assertEqual([os.path.basename(f) for f in files],
+                         ["media-00001.ndjson.gz", "media-00002.ndjson.gz",
+                          "media-00003.ndjson.gz"])
+        exported = []
+        for f in files:
+            with gzip.open(f, "rt", encoding="utf-8") as lines:
+                exported.extend(json.loads(line) for line in lines)
+        self.assertEqual(exported, self.library)
+
+    def test_csv_columns(self):
+        path = os.path.join(self.tmp, "media.csv")
+        self.assertEqual(export(self.media_manager.list(), path), [path])
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), 250)
+        self.assertEqual(rows[3]["mediaMetadata/creationTime"],
+                         self.library[3]["mediaMetadata"]["creationTime"])
+        self.assertEqual(rows[3]["productUrl"], "")
+
+    def test_rotation_keeps_the_last_extension(self):
+        path = os.path.join(self.tmp, "library.2024.csv")
+        files = export(self.media_manager.list(), path, max_rows=200)
+        self.assertEqual([os.path.basename(f) for f in files],
+                         ["library.2024-00001.csv", "library.2024-00002.csv"])
+
+    def test_csv_records_have_the_columns_of_dicts(self):
+        dicts = os.path.join(self.tmp, "dicts.csv")
+        records = os.path.join(self.tmp, "records.csv")
+        export(self.media_manager.list(), dicts)
+        export(self.media_manager.list(as_records=True), records)
+        with open(dicts, newline="", encoding="utf-8") as f:
+            expected = list(csv.DictReader(f))
+        with open(records, newline="", encoding="utf-8") as f:
+            self.assertEqual(list(csv.DictReader(f)), expected)
+
+    def test_records_and_empty_export(self):
+        path = os.path.join(self.tmp, "records.ndjson")
+        export(self.media_manager.list(as_records=True), path)
+        with open(path, encoding="utf-8") as f:
+            first = json.loads(f.readline())
+        self.assertEqual(first["id"], "media0")
+        self.assertEqual(first["width"], 4000)
+
+        path = os.path.join(self.tmp, "albums.csv")
+        export(iter([]), path, columns=ALBUM_COLUMNS)
+        with open(path, encoding="utf-8") as f:
+            self.assertEqual(f.read().strip(), ",".join(ALBUM_COLUMNS))
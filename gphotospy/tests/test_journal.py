@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from gphotospy import media
+from gphotospy.journal import UploadJournal
+from gphotospy.media import Media
+from gphotospy.tests.test_media import FakeService, fake_upload
+
+
+class TestUploadJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "pending.db")
+        self._upload = media.upload
+        media.upload = fake_upload
+
+    def tearDown(self):
+        media.upload = self._upload
+        shutil.rmtree(self.tmp)
+
+    def test_recover_after_crash(self):
+        crashed = Media({"service": None, "secrets": "secrets"})
+        crashed.set_journal(UploadJournal(self.path))
+        crashed.stage_many(["a.jpg", "b.jpg", "c.jpg"])
+
+        service = FakeService()
+        media_manager = Media({"service": service, "secrets": "secrets"})
+        media_manager.set_journal(UploadJournal(self.path))
+        recovered = media_manager.recover()
+        self.assertEqual(
+            sorted(m["simpleMediaItem"]["fileName"] for m in recovered),
+            ["a.jpg", "b.jpg", "c.jpg"])
+        # Recovering twice does not stage twice
+        self.assertEqual(media_manager.recover(), [])
+
+        media_manager.batchCreate(album_id="album")
+        self.assertEqual(len(service.media_items.batches), 1)
+        self.assertEqual(media_manager.recover(), [])
+
+    def test_created_tokens_are_never_sent_again(self):
+        journal = UploadJournal(self.path)
+        service = FakeService()
+        media_manager = Media({"service": service, "secrets": "secrets"})
+        media_manager.set_journal(journal)
+        media_manager.stage_media("a.jpg")
+        items = list(media_manager._staged_media)
+        media_manager.batchCreate(album_id="album")
+
+        # A retry with the same upload objects creates nothing
+        self.assertEqual(
+            media_manager.batchCreate(album_id="album", media_items=items),
+            [])
+        self.assertEqual(len(service.media_items.batches), 1)
+
+    def test_expired_tokens_are_not_recovered(self):
+        journal = UploadJournal(self.path)
+        media_manager = Media({"service": None, "secrets": "secrets"})
+        media_manager.set_journal(journal)
+        media_manager.stage_media("a.jpg")
+        self.assertEqual(journal.pending(max_age=-1), [])
+        self.assertEqual(journal.expired(max_age=-1), ["a.jpg"])
+        journal.purge(max_age=-1)
+        self.assertEqual(journal.pending(), [])
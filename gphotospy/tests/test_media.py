@@ -0,0 +1,381 @@
+import time
+import random
+import datetime
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from gphotospy import media
+from gphotospy.media import Media
+
+
+def fake_upload(secrets, media_file, **kwargs):
+    time.sleep(random.random() / 100)
+    if "broken" in media_file:
+        raise IOError("cannot read " + media_file)
+    return "token-" + media_file
+
+
+class TestStageMany(unittest.TestCase):
+    def setUp(self):
+        self._upload = media.upload
+        media.upload = fake_upload
+        self.media_manager = Media({"service": None, "secrets": "secrets"})
+
+    def tearDown(self):
+        media.upload = self._upload
+
+    def test_results_in_input_order(self):
+        files = ["file{}.jpg".format(i) for i in range(40)]
+        files[7] = "broken.jpg"
+        results = self.media_manager.stage_many(files, workers=8)
+
+        self.assertEqual([r["media_file"] for r in results], files)
+        self.assertIsInstance(results[7]["error"], IOError)
+        self.assertIsNone(results[7]["upload_object"])
+        staged = [m["simpleMediaItem"]["uploadToken"]
+                  for m in self.media_manager._staged_media]
+        self.assertEqual(staged, ["token-" + f for f in files if f != "broken.jpg"])
+
+
+class FakeRequest:
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        return self.result
+
+
+def make_library(n, first=datetime.date(2015, 1, 1), days=2000):
+    """ n fake media items spread over days, some on the same day """
+    rnd = random.Random(n)
+    library = []
+    for i in range(n):
+        day = first + datetime.timedelta(days=rnd.randrange(days))
+        library.append({
+            "id": "media{}".format(i),
+            "filename": "IMG_{}.jpg".format(i),
+            "mimeType": "image/jpeg",
+            "mediaMetadata": {
+                "creationTime": "{}T{:02d}:00:00Z".format(
+                    day.isoformat(), i % 24),
+                "width": "4000",
+                "height": "3000",
+                "photo": {}
+            }
+        })
+    return library
+
+
+def _in_ranges(media, ranges):
+    day = media["mediaMetadata"]["creationTime"][:10]
+    for r in ranges:
+        start = datetime.date(**r["startDate"]).isoformat()
+        end = datetime.date(**r["endDate"]).isoformat()
+        if start <= day <= end:
+            return True
+    return False
+
+
+def _page(items, page_size, page_token):
+    offset = int(page_token or 0)
+    result = {"mediaItems": items[offset:offset + page_size]}
+    if offset + page_size < len(items):
+        result["nextPageToken"] = str(offset + page_size)
+    return result
+
+
+class FakeMediaItems:
+    def __init__(self, library=()):
+        self.batches = []
+        self.library = list(library)
+        self.requests = 0
+        self.fields = []
+        self.bodies = []
+        self.batch_gets = []
+        self.flaky = {}
+
+    def list(self, pageSize, pageToken, fields=None):
+        self.requests += 1
+        self.fields.append(fields)
+        return FakeRequest(_page(self.library, pageSize, pageToken))
+
+    def search(self, body, fields=None):
+        self.requests += 1
+        self.bodies.append(body)
+        self.fields.append(fields)
+        items = self.library
+        ranges = body.get("filters", {}).get(
+            "dateFilter", {}).get("ranges")
+        if ranges:
+            items = [m for m in items if _in_ranges(m, ranges)]
+            # As the API: the newest first
+            items = sorted(items, reverse=True, key=lambda m: m[
+                "mediaMetadata"]["creationTime"])
+        return FakeRequest(
+            _page(items, body["pageSize"], body["pageToken"]))
+
+    def get(self, mediaItemId):
+        self.requests += 1
+        return FakeRequest(self._by_id()[mediaItemId])
+
+    def batchGet(self, mediaItemIds):
+        self.requests += 1
+        self.batch_gets.append(len(mediaItemIds))
+        by_id = self._by_id()
+        return FakeRequest({"mediaItemResults": [
+            {"mediaItem": by_id[i]} if i in by_id
+            else {"status": {"code": 5, "message": "not found"}}
+            for i in mediaItemIds]})
+
+    def _by_id(self):
+        return {m["id"]: m for m in self.library}
+
+    def batchCreate(self, body):
+        self.batches.append(body)
+        results = []
+        for m in body["newMediaItems"]:
+            item = m["simpleMediaItem"]
+            result = {"uploadToken": item["uploadToken"]}
+            failures = self.flaky.get(item["fileName"], 0)
+            if failures:
+                self.flaky[item["fileName"]] = failures - 1
+                result["status"] = {"code": 14, "message": "unavailable"}
+            elif "invalid" in item["fileName"]:
+                result["status"] = {"code": 3, "message": "invalid"}
+            else:
+                result["mediaItem"] = {"id": "id-" + item["fileName"]}
+            results.append(result)
+        return FakeRequest({"newMediaItemResults": results})
+
+
+class FakeService:
+    def __init__(self, library=()):
+        self.media_items = FakeMediaItems(library)
+
+    def mediaItems(self):
+        return self.media_items
+
+
+class TestStageAndCreate(unittest.TestCase):
+    def setUp(self):
+        self._upload = media.upload
+        media.upload = fake_upload
+        self.service = FakeService()
+        self.media_manager = Media({"service": self.service,
+                                    "secrets": "secrets"})
+
+    def tearDown(self):
+        media.upload = self._upload
+
+    def test_results_stream_in_order(self):
+        files = ["file{}.jpg".format(i) for i in range(120)]
+        files[60] = "broken.jpg"
+        results = list(self.media_manager.stage_and_create(
+            files, workers=8, album_id="album"))
+
+        self.assertEqual([r["media_file"] for r in results], files)
+        self.assertIsInstance(results[60]["error"], IOError)
+        self.assertEqual(results[0]["result"]["mediaItem"]["id"],
+                         "id-file0.jpg")
+        self.assertEqual([len(b["newMediaItems"])
+                          for b in self.service.media_items.batches],
+                         [50, 49, 20])
+        self.assertEqual(self.media_manager._staged_media, [])
+
+    def test_slow_upload_does_not_block_the_others(self):
+        others = []
+        released = threading.Event()
+        waited = []
+
+        def upload(secrets, media_file, **kwargs):
+            if media_file == "big.jpg":
+                # Ends only once all the other uploads are done
+                waited.append(released.wait(5))
+            else:
+                others.append(media_file)
+                if len(others) == 60:
+                    released.set()
+            return "token-" + media_file
+
+        media.upload = upload
+        files = ["big.jpg"] + ["file{}.jpg".format(i) for i in range(60)]
+        results = list(self.media_manager.stage_and_create(
+            files, workers=8, album_id="album"))
+        self.assertEqual(waited, [True])
+        self.assertEqual([r["media_file"] for r in results], files)
+        self.assertEqual(self.service.media_items.batches[0][
+            "newMediaItems"][0]["simpleMediaItem"]["fileName"], "big.jpg")
+
+
+class TestListParallel(unittest.TestCase):
+    def test_all_media_once(self):
+        library = make_library(3000)
+        service = FakeService(library)
+        media_manager = Media({"service": service, "secrets": "secrets"})
+        found = list(media_manager.list_parallel(workers=4))
+        self.assertEqual(sorted(m["id"] for m in found),
+                         sorted(m["id"] for m in library))
+
+    def test_split_does_not_fetch_pages_again(self):
+        library = make_library(10000)
+        service = FakeService(library)
+        media_manager = Media({"service": service, "secrets": "secrets"})
+        found = list(media_manager.list_parallel(workers=2))
+        self.assertEqual(len(found), 10000)
+        # A serial list() takes 100 pages; the shards add a partial
+        # page each, and the day read again at each split
+        self.assertLess(service.media_items.requests, 100 * 1.25)
+
+    def test_fields_include_creation_time(self):
+        service = FakeService(make_library(100))
+        media_manager = Media({"service": service, "secrets": "secrets"})
+        list(media_manager.list_parallel(workers=1, fields="id"))
+        self.assertEqual(
+            set(service.media_items.fields),
+            {"nextPageToken,mediaItems(id,mediaMetadata/creationTime)"})
+
+    def test_ordered_by_creation_time(self):
+        library = make_library(500)
+        media_manager = Media({"service": FakeService(library),
+                               "secrets": "secrets"})
+        media_manager._SHARD_SPLIT_PAGES = 1
+        found = list(media_manager.list_parallel(
+            workers=3, start=media.date(2015, 1, 1), ordered=True))
+        times = [m["mediaMetadata"]["creationTime"] for m in found]
+        self.assertEqual(len(found), 500)
+        self.assertEqual(times, sorted(times))
+
+
+class TestFieldsMask(unittest.TestCase):
+    def test_mask_sent_on_every_page(self):
+        service = FakeService(make_library(250))
+        media_manager = Media({"service": service, "secrets": "secrets"})
+        found = list(media_manager.list(
+            fields=["id", "mediaMetadata/creationTime"]))
+        self.assertEqual(len(found), 250)
+        self.assertEqual(
+            set(service.media_items.fields),
+            {"nextPageToken,mediaItems(id,mediaMetadata/creationTime)"})
+
+    def test_no_mask_by_default(self):
+        service = FakeService(make_library(10))
+        media_manager = Media({"service": service, "secrets": "secrets"})
+        list(media_manager.search(media.MEDIAFILTER.PHOTO))
+        self.assertEqual(service.media_items.fields, [None])
+
+
+class TestMediaRecord(unittest.TestCase):
+    def test_from_api(self):
+        record = media.MediaRecord.from_api({
+            "id": "abc",
+            "filename": "IMG_1.jpg",
+            "mimeType": "image/jpeg",
+            "baseUrl": "https://example.com/abc",
+            "mediaMetadata": {
+                "creationTime": "2014-10-02T15:01:23.045123456Z",
+                "width": "4000",
+                "height": "3000",
+                "photo": {}
+            }
+        })
+        self.assertEqual(record.creation_time, 1412262083)
+        self.assertEqual(record.dimensions(), (4000, 3000))
+        self.assertTrue(record.is_photo())
+        self.assertFalse(hasattr(record, "__dict__"))
+        # The base URL expires: not kept
+        self.assertFalse(hasattr(record, "base_url"))
+
+    def test_missing_fields_get_defaults(self):
+        record = media.MediaRecord.from_api({"id": "abc"})
+        self.assertEqual(record, media.MediaRecord("abc"))
+
+    def test_list_and_search_yield_records(self):
+        library = make_library(150)
+        media_manager = Media({"service": FakeService(library),
+                               "secrets": "secrets"})
+        records = media_manager.list(as_records=True)
+        first = next(records)
+        self.assertIsInstance(first, media.MediaRecord)
+        self.assertEqual(first.id, "media0")
+        # Checkpoints still work on records
+        self.assertEqual(records.checkpoint()["position"], 1)
+        found = list(media_manager.search(
+            media.MEDIAFILTER.ALL_MEDIA, as_records=True))
+        self.assertEqual([r.id for r in found], [m["id"] for m in library])
+
+
+class TestBatchGet(unittest.TestCase):
+    def setUp(self):
+        self.library = make_library(120)
+        self.service = FakeService(self.library)
+        self.media_manager = Media({"service": self.service,
+                                    "secrets": "secrets"})
+
+    def test_chunks_in_order(self):
+        ids = [m["id"] for m in reversed(self.library)] + ["missing"]
+        results = self.media_manager.batch_get(ids, workers=3)
+        self.assertEqual(sorted(self.service.media_items.batch_gets),
+                         [21, 50, 50])
+        self.assertEqual([r["mediaItem"]["id"] for r in results[:-1]],
+                         ids[:-1])
+        self.assertEqual(results[-1]["status"]["code"], 5)
+
+    def test_concurrent_gets_are_coalesced(self):
+        self.media_manager.set_get_coalescing(True, window=0.05)
+        ids = [m["id"] for m in self.library[:100]]
+        with ThreadPoolExecutor(max_workers=100) as executor:
+            found = list(executor.map(self.media_manager.get, ids))
+        self.assertEqual([m["id"] for m in found], ids)
+        self.assertLess(self.service.media_items.requests, 10)
+        with self.assertRaises(media.MediaError):
+            self.media_manager.get("missing")
+
+
+class TestBatchCreate(unittest.TestCase):
+    def setUp(self):
+        self._backoff = media.CREATE_BACKOFF
+        media.CREATE_BACKOFF = 0
+        self.service = FakeService()
+        self.media_manager = Media({"service": self.service,
+                                    "secrets": "secrets"})
+        self.items = [self.media_manager.get_upload_object(
+            "token{}".format(i), file_name="file{}.jpg".format(i))
+            for i in range(130)]
+
+    def tearDown(self):
+        media.CREATE_BACKOFF = self._backoff
+
+    def test_transient_failures_are_retried(self):
+        self.service.media_items.flaky = {"file3.jpg": 1, "file70.jpg": 2,
+                                          "file99.jpg": 10}
+        self.items[5]["simpleMediaItem"]["fileName"] = "invalid.jpg"
+        report = self.media_manager.batchCreate(
+            album_id="album", media_items=self.items, workers=3)
+
+        self.assertEqual([r["uploadToken"] for r in report],
+                         ["token{}".format(i) for i in range(130)])
+        self.assertEqual(sorted(r["uploadToken"] for r in report.failed),
+                         ["token5", "token99"])
+        self.assertEqual(report.rounds, 1 + media.CREATE_RETRIES)
+        self.assertEqual(report.retried, 3 + 2 + 1)
+
+    def test_sequential_by_default(self):
+        self.media_manager.batchCreate(album_id="album",
+                                       media_items=self.items)
+        self.assertEqual(
+            [b["newMediaItems"][0]["simpleMediaItem"]["fileName"]
+             for b in self.service.media_items.batches],
+            ["file0.jpg", "file50.jpg", "file100.jpg"])
+
+    def test_album_position_keeps_order(self):
+        position = media.set_position(media.POSITION.LAST)
+        self.media_manager.batchCreate(album_id="album",
+                                       album_position=position,
+                                       media_items=self.items)
+        positions = [b["albumPosition"]
+                     for b in self.service.media_items.batches]
+        self.assertEqual(positions, [
+            position,
+            media.set_position(media.POSITION.AFTER_MEDIA, "id-file49.jpg"),
+            media.set_position(media.POSITION.AFTER_MEDIA, "id-file99.jpg")])
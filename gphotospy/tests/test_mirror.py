@@ -0,0 +1,107 @@
+import os
+import json
+import shutil
+import datetime
+import tempfile
+import unittest
+
+from gphotospy.media import Media
+from gphotospy.mirror import Mirror
+from gphotospy.tests.test_media import FakeService, make_library
+
+
+class TestMirror(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.mirror = Mirror(os.path.join(self.tmp, "library.db"))
+        self.library = make_library(1200)
+        self.service = FakeService(self.library)
+        self.media_manager = Media({"service": self.service,
+                                    "secrets": "secrets"})
+
+    def tearDown(self):
+        self.mirror.close()
+        shutil.rmtree(self.tmp)
+
+    def test_populate_and_answer_from_mirror(self):
+        self.mirror.populate(self.media_manager)
+        self.assertEqual(self.mirror.count(), 1200)
+        self.media_manager.set_mirror(self.mirror, max_staleness=60)
+
+        requests = self.service.media_items.requests
+        self.assertEqual(self.media_manager.get("media7"), self.library[7])
+        mirrored = list(self.media_manager.list())
+        self.assertEqual(self.service.media_items.requests, requests)
+        self.assertEqual(len(mirrored), 1200)
+        times = [m["mediaMetadata"]["creationTime"] for m in mirrored]
+        self.assertEqual(times, sorted(times, reverse=True))
+
+    def test_incremental_refresh(self):
+        self.mirror.refresh(self.media_manager)
+        self.assertEqual(self.mirror.count(), 1200)
+
+        today = datetime.date.today().isoformat()
+        self.service.media_items.library.append({
+            "id": "new", "mediaMetadata": {
+                "creationTime": today + "T10:00:00Z"}})
+        requests = self.service.media_items.requests
+        self.mirror.refresh(self.media_manager)
+        # only the media since the watermark are fetched
+        self.assertEqual(self.service.media_items.requests, requests + 1)
+        self.assertEqual(self.mirror.count(), 1201)
+        self.assertEqual(self.mirror.watermark(), today + "T10:00:00Z")
+
+    def test_stale_mirror_is_not_used(self):
+        self.media_manager.set_mirror(self.mirror, max_staleness=60)
+        self.assertEqual(len(list(self.media_manager.list())), 1200)
+        self.assertEqual(self.mirror.count(), 0)
+
+    def test_populate_and_refresh_search_the_same_set(self):
+        self.media_manager.show_archived(True)
+        self.mirror.populate(self.media_manager)
+        self.mirror.refresh(self.media_manager)
+        bodies = self.service.media_items.bodies
+        self.assertEqual(len(bodies), 13)
+        for body in bodies:
+            self.assertTrue(body["filters"]["includeArchivedMedia"])
+            self.assertIn("ranges", body["filters"]["dateFilter"])
+
+    def test_mirror_list_options(self):
+        self.mirror.populate(self.media_manager)
+        self.media_manager.set_mirror(self.mirror, max_staleness=60)
+        requests = self.service.media_items.requests
+
+        records = list(self.media_manager.list(as_records=True))
+        self.assertEqual(len(records), 1200)
+        self.assertEqual(records[0].creation_time,
+                         max(r.creation_time for r in records))
+        slim = next(self.media_manager.list(
+            fields="id,mediaMetadata/creationTime"))
+        self.assertEqual(slim.keys(), {"id", "mediaMetadata"})
+        self.assertEqual(list(slim["mediaMetadata"]), ["creationTime"])
+
+        media_iterator = self.media_manager.list(prefetch=2)
+        first = [next(media_iterator)["id"] for _ in range(700)]
+        checkpoint = json.loads(json.dumps(media_iterator.checkpoint()))
+        rest = [m["id"] for m in self.media_manager.list(
+            resume_from=checkpoint)]
+        self.assertEqual(len(set(first + rest)), 1200)
+        self.assertEqual(self.service.media_items.requests, requests)
+
+    def test_columns_from_mirror(self):
+        for i, media in enumerate(self.library[:100]):
+            media["mediaMetadata"]["photo"] = {
+                "cameraMake": "make{}".format(i)}
+        expected = self.media_manager.to_columns()
+        self.mirror.populate(self.media_manager)
+        self.media_manager.set_mirror(self.mirror, max_staleness=60)
+        requests = self.service.media_items.requests
+        columns = self.media_manager.to_columns()
+        self.assertEqual(self.service.media_items.requests, requests)
+        # The mirror walks newest first: compare by id
+        for name in ("creation_time", "width", "height", "fps",
+                     "camera_make", "mime_category"):
+            self.assertEqual(
+                dict(zip(columns.id, getattr(columns, name))),
+                dict(zip(expected.id, getattr(expected, name))))
+        self.assertEqual(set(columns.width), {4000})
@@ -0,0 +1,130 @@
+import unittest
+
+from gphotospy import media
+from gphotospy.media import Media, QueryError, MEDIAFILTER, CONTENTFILTER
+from gphotospy.query import filename, mime_type, width, camera, created, where
+from gphotospy.query import Or, And
+from gphotospy.tests.test_media import FakeService, make_library
+
+
+class TestPredicates(unittest.TestCase):
+    def setUp(self):
+        self.photo = make_library(1)[0]
+        self.photo["mediaMetadata"]["photo"] = {"cameraMake": "Google"}
+
+    def test_combinations(self):
+        self.assertTrue(filename("img_*.JPG")(self.photo))
+        self.assertTrue((mime_type("image/*") & width(min=4000))(self.photo))
+        self.assertFalse((width(max=3999) | camera(model="4a"))(self.photo))
+        self.assertTrue((~camera(make="canon"))(self.photo))
+        self.assertTrue(created(after=0, before=2 ** 40)(self.photo))
+
+    def test_short_circuit(self):
+        calls = []
+        predicate = width(max=0) & where(calls.append)
+        self.assertFalse(predicate(self.photo))
+        self.assertEqual(calls, [])
+
+
+class TestQuery(unittest.TestCase):
+    def setUp(self):
+        self.library = make_library(500)
+        self.service = FakeService(self.library)
+        self.media_manager = Media({"service": self.service,
+                                    "secrets": "secrets"})
+
+    def test_push_down_and_client_filters(self):
+        found = list(self.media_manager.query(
+            MEDIAFILTER.PHOTO, filename("IMG_1*")))
+        self.assertEqual([m["id"] for m in found],
+                         [m["id"] for m in self.library
+                          if m["filename"].startswith("IMG_1")])
+        body = self.service.media_items.bodies[0]
+        self.assertEqual(body["filters"]["mediaTypeFilter"],
+                         {"mediaTypes": ["PHOTO"]})
+
+    def test_filters_of_a_group_are_anded(self):
+        with self.assertRaises(QueryError):
+            self.media_manager.query(CONTENTFILTER.PETS, CONTENTFILTER.FOOD)
+        # One date range sent, the other one evaluated on the client
+        found = list(self.media_manager.query(
+            media.date_range(media.date(2016, 1, 1),
+                             media.date(2016, 12, 31)),
+            media.date_range(media.date(2016, 7, 1),
+                             media.date(2017, 12, 31))))
+        self.assertEqual(
+            sorted(m["id"] for m in found),
+            sorted(m["id"] for m in self.library
+                   if "2016-07" <= m["mediaMetadata"]["creationTime"]
+                   < "2017"))
+        self.assertTrue(found)
+        self.assertEqual(len(self.service.media_items.bodies[0]["filters"]
+                             ["dateFilter"]["ranges"]), 1)
+        self.assertEqual(list(self.media_manager.query(
+            MEDIAFILTER.PHOTO, MEDIAFILTER.VIDEO)), [])
+
+    def test_limit_stops_fetching(self):
+        found = list(self.media_manager.query(filename("*.jpg"), limit=3))
+        self.assertEqual(len(found), 3)
+        self.assertEqual(self.service.media_items.requests, 1)
+
+    def test_album_filters_on_client(self):
+        year = media.date_range(media.date(2016, 1, 1),
+                                media.date(2016, 12, 31))
+        found = list(self.media_manager.query(
+            year, MEDIAFILTER.PHOTO, album_id="album"))
+        self.assertEqual(
+            [m["id"] for m in found],
+            [m["id"] for m in self.library
+             if m["mediaMetadata"]["creationTime"].startswith("2016")])
+        self.assertTrue(found)
+        with self.assertRaises(QueryError):
+            self.media_manager.query(CONTENTFILTER.PETS, album_id="album")
+
+
+def _year(year, last=None):
+    return media.date_range(media.date(year, 1, 1),
+                            media.date(last or year, 12, 31))
+
+
+class TestSearchAny(unittest.TestCase):
+    def setUp(self):
+        self.library = make_library(1000)
+        self.service = FakeService(self.library)
+        self.media_manager = Media({"service": self.service,
+                                    "secrets": "secrets"})
+
+    def test_plan_merges_or_groups(self):
+        expression = And(Or(CONTENTFILTER.PETS, CONTENTFILTER.FOOD),
+                         Or(media.date(2019), media.date(2021)))
+        plan = self.media_manager.search_plan(expression)
+        self.assertEqual(len(plan), 1)
+        self.assertEqual(
+            sorted(plan[0]["contentFilter"]["includedContentCategories"]),
+            ["FOOD", "PETS"])
+        self.assertEqual(len(plan[0]["dateFilter"]["dates"]), 2)
+
+    def test_plan_drops_subsumed_and_empty_terms(self):
+        expression = Or(CONTENTFILTER.PETS,
+                        And(CONTENTFILTER.PETS, media.date(2019)),
+                        And(MEDIAFILTER.PHOTO, MEDIAFILTER.VIDEO))
+        plan = self.media_manager.search_plan(expression)
+        self.assertEqual(plan, [self.media_manager._search_filters(
+            [CONTENTFILTER.PETS])])
+
+    def test_plan_rejects_and_of_or_groups(self):
+        with self.assertRaises(QueryError):
+            self.media_manager.search_plan(
+                And(CONTENTFILTER.PETS, CONTENTFILTER.FOOD))
+
+    def test_concurrent_searches_dedup(self):
+        expression = Or(And(_year(2016), MEDIAFILTER.PHOTO),
+                        And(_year(2015, 2016), MEDIAFILTER.VIDEO))
+        self.assertEqual(len(self.media_manager.search_plan(expression)), 2)
+        found = list(self.media_manager.search_any(expression, workers=2))
+        # The fake service ignores the media type: both overlap on 2016
+        self.assertEqual(
+            sorted(m["id"] for m in found),
+            sorted(m["id"] for m in self.library
+                   if m["mediaMetadata"]["creationTime"][:4]
+                   in ("2015", "2016")))
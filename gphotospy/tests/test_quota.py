@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from gphotospy import quota
+from gphotospy.executor import RequestExecutor
+from gphotospy.quota import (QuotaAccountant, QuotaExceeded, QuotaDeferred,
+                             API, MEDIA, HIGH, LOW)
+from gphotospy.album import Album
+from gphotospy.media import Media
+from gphotospy.tests import test_album
+from gphotospy.tests.test_media import FakeRequest, FakeService, make_library
+from gphotospy.utils import prefetch
+
+
+class TestQuotaAccountant(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "quota.db")
+        self._clock = quota._quota_clock
+        # Half of the quota day elapsed
+        quota._quota_clock = lambda: ("2026-10-17", 0.5)
+
+    def tearDown(self):
+        quota._quota_clock = self._clock
+        quota.set_accountant(None)
+        shutil.rmtree(self.tmp)
+
+    def test_counts_are_shared(self):
+        first = QuotaAccountant(self.path, limits={API: 10, MEDIA: 5})
+        second = QuotaAccountant(self.path, limits={API: 10, MEDIA: 5})
+        first.acquire(API, 4)
+        second.acquire(API, 6)
+        second.acquire(MEDIA)
+        self.assertEqual(first.remaining(API), 0)
+        self.assertEqual(first.remaining(MEDIA), 4)
+        with self.assertRaises(QuotaExceeded):
+            first.acquire(API)
+
+    def test_low_priority_keeps_reserve_and_pace(self):
+        accountant = QuotaAccountant(self.path, limits={API: 1000},
+                                     reserve=0.2, low_burst=10)
+        # Pace: 800 * 0.5 + 10 low priority requests so far
+        accountant.acquire(API, 410, priority=LOW)
+        with self.assertRaises(QuotaDeferred) as deferred:
+            accountant.acquire(API, priority=LOW)
+        self.assertGreater(deferred.exception.wait, 0)
+        # High priority requests are not held back
+        accountant.acquire(API, 590, priority=HIGH)
+        self.assertEqual(accountant.remaining(API), 0)
+
+    def test_priority_follows_prefetch_and_executor(self):
+        accountant = QuotaAccountant(self.path)
+        quota.set_accountant(accountant)
+        executor = RequestExecutor()
+
+        def pages():
+            for i in range(3):
+                yield executor.execute(FakeRequest(i))
+
+        with quota.priority(LOW):
+            self.assertEqual(list(prefetch(pages(), 2)), [0, 1, 2])
+        executor.execute(FakeRequest(3), cost=5)
+        self.assertEqual(accountant.used(API, LOW), 3)
+        self.assertEqual(accountant.used(API, HIGH), 5)
+
+    def test_priority_follows_thread_pools(self):
+        accountant = QuotaAccountant(self.path)
+        quota.set_accountant(accountant)
+        library = make_library(120)
+        ids = [m["id"] for m in library]
+        media_manager = Media({"service": FakeService(library),
+                               "secrets": "secrets"})
+        album_manager = Album({"service": test_album.FakeService(),
+                               "secrets": "secrets"})
+        with quota.priority(LOW):
+            media_manager.batch_get(ids, workers=3)
+            album_manager.batchAddMediaItems("album", ids[:100], workers=2)
+            # Sent by the timer thread of the coalescer
+            media_manager.set_get_coalescing(True, window=0.01)
+            media_manager.get(ids[0])
+        self.assertEqual(accountant.used(API, LOW), 3 + 2 + 1)
+        self.assertEqual(accountant.used(API, HIGH), 0)
@@ -0,0 +1,63 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import multiprocessing
+
+from gphotospy import ratelimit
+from gphotospy.quota import API
+from gphotospy.executor import RequestExecutor
+from gphotospy.ratelimit import SharedRateLimiter
+from gphotospy.tests.test_media import FakeRequest
+
+
+def take_tokens(path, n):
+    limiter = SharedRateLimiter(path, rate=50, burst=5)
+    for _ in range(n):
+        limiter.acquire()
+
+
+class TestSharedRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "rate.db")
+
+    def tearDown(self):
+        ratelimit.set_limiter(None)
+        shutil.rmtree(self.tmp)
+
+    def test_rate_shared_by_processes(self):
+        SharedRateLimiter(self.path, rate=50, burst=5).close()
+        start = time.monotonic()
+        workers = [multiprocessing.Process(target=take_tokens,
+                                           args=(self.path, 10))
+                   for _ in range(4)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        elapsed = time.monotonic() - start
+        self.assertTrue(all(w.exitcode == 0 for w in workers))
+        # 40 tokens at 50 per second, 5 of them from the full bucket
+        self.assertGreaterEqual(elapsed, (40 - 5) / 50)
+
+    def test_try_acquire_and_credit(self):
+        limiter = SharedRateLimiter(self.path, rate=1, burst=2)
+        self.assertTrue(limiter.try_acquire(2))
+        self.assertFalse(limiter.try_acquire())
+        self.assertFalse(limiter.acquire(timeout=0.1))
+
+        other = SharedRateLimiter(self.path, rate=100, burst=2, name="other")
+        # More than burst tokens are taken on credit
+        self.assertTrue(other.acquire(5))
+        self.assertFalse(other.try_acquire())
+
+    def test_executor_is_throttled(self):
+        limiter = SharedRateLimiter(self.path, rate=20, burst=1)
+        ratelimit.set_limiter(limiter, API)
+        executor = RequestExecutor()
+        start = time.monotonic()
+        for i in range(5):
+            executor.execute(FakeRequest(i))
+        self.assertGreaterEqual(time.monotonic() - start, 4 / 20)
@@ -0,0 +1,176 @@
+import os
+import json
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from gphotospy import upload
+
+
+class FakeCredentials:
+    token = "fake-token"
+
+
+class FakeUploadServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the Google Photos upload endpoint.
+
+    `drop_chunks` lists the (0 based) upload requests during which the
+    server reads only half of the body and then drops the connection;
+    `throttle_chunks` those answered 429, without keeping the body.
+    """
+    daemon_threads = True
+    granularity = 16
+
+    def __init__(self, drop_chunks=(), throttle_chunks=()):
+        super().__init__(("127.0.0.1", 0), FakeUploadHandler)
+        self.drop_chunks = set(drop_chunks)
+        self.throttle_chunks = set(throttle_chunks)
+        self.commands = []
+        self.chunk_requests = 0
+        self.dropped = 0
+        self.sessions_started = 0
+        self.data = bytearray()
+        self.final = False
+        self.connections = 0
+
+    def get_request(self):
+        self.connections += 1
+        return super().get_request()
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{}".format(self.server_address[1])
+
+
+class FakeUploadHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, headers=None, body=b"", status=200):
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server = self.server
+        command = self.headers.get("X-Goog-Upload-Command")
+        length = int(self.headers.get("Content-Length", 0))
+        server.commands.append(command)
+        if command == "start":
+            assert self.headers["X-Goog-Upload-Protocol"] == "resumable"
+            server.sessions_started += 1
+            server.data = bytearray()
+            server.final = False
+            return self._reply({
+                "X-Goog-Upload-URL": server.url + "/session",
+                "X-Goog-Upload-Chunk-Granularity": str(server.granularity),
+                "X-Goog-Upload-Status": "active"})
+        if command == "query":
+            return self._reply({
+                "X-Goog-Upload-Status": "final" if server.final else "active",
+                "X-Goog-Upload-Size-Received": str(len(server.data))})
+
+        assert int(self.headers["X-Goog-Upload-Offset"]) == len(server.data)
+        request_number = server.chunk_requests
+        server.chunk_requests += 1
+        if request_number in server.drop_chunks:
+            # Keep only what a real server would have acknowledged
+            partial = self.rfile.read(length // 2)
+            keep = len(partial) // server.granularity * server.granularity
+            server.data += partial[:keep]
+            server.dropped += 1
+            self.close_connection = True
+            self.connection.shutdown(2)
+            return
+        if request_number in server.throttle_chunks:
+            self.rfile.read(length)
+            return self._reply({"Retry-After": "0"}, status=429)
+        server.data += self.rfile.read(length)
+        if "finalize" in command:
+            server.final = True
+            return self._reply(body=b"upload-token")
+        self._reply({"X-Goog-Upload-Status": "active"})
+
+
+class TestResumableUpload(unittest.TestCase):
+    def setUp(self):
+        self._saved = (upload.upload_url, upload.get_credentials,
+                       upload.RESUME_BACKOFF, upload.MAX_RESUME_ATTEMPTS)
+        upload.get_credentials = lambda secrets: FakeCredentials()
+        upload.RESUME_BACKOFF = 0
+        self.tmp = tempfile.TemporaryDirectory()
+        self.media_file = os.path.join(self.tmp.name, "video.mp4")
+        self.content = os.urandom(1000)
+        with open(self.media_file, "wb") as f:
+            f.write(self.content)
+
+    def tearDown(self):
+        (upload.upload_url, upload.get_credentials,
+         upload.RESUME_BACKOFF, upload.MAX_RESUME_ATTEMPTS) = self._saved
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def start_server(self, drop_chunks=(), throttle_chunks=()):
+        self.server = FakeUploadServer(drop_chunks, throttle_chunks)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        upload.upload_url = self.server.url + "/v1/uploads"
+
+    def test_upload_without_drops(self):
+        self.start_server()
+        token = upload.upload(
+            "secrets.json", self.media_file, resumable=True, chunk_size=100)
+        self.assertEqual(token, "upload-token")
+        self.assertEqual(bytes(self.server.data), self.content)
+        # chunk size is rounded to the granularity: 96 bytes per chunk
+        self.assertEqual(self.server.chunk_requests, 11)
+        # all the requests went through one keep-alive connection
+        self.assertEqual(self.server.connections, 1)
+
+    def test_resume_after_dropped_connections(self):
+        self.start_server(drop_chunks=(1, 4, 5))
+        token = upload.upload(
+            "secrets.json", self.media_file, resumable=True, chunk_size=128)
+        self.assertEqual(token, "upload-token")
+        self.assertEqual(self.server.dropped, 3)
+        self.assertEqual(self.server.sessions_started, 1)
+        self.assertEqual(bytes(self.server.data), self.content)
+
+    def test_resume_after_throttled_chunk(self):
+        self.start_server(throttle_chunks=(1, ))
+        token = upload.upload(
+            "secrets.json", self.media_file, resumable=True, chunk_size=128)
+        self.assertEqual(token, "upload-token")
+        self.assertEqual(self.server.commands[:4],
+                         ["start", "upload", "upload", "query"])
+        self.assertEqual(self.server.sessions_started, 1)
+        self.assertEqual(bytes(self.server.data), self.content)
+
+    def test_resume_saved_session_in_later_call(self):
+        self.start_server(drop_chunks=(2,))
+        session_file = os.path.join(self.tmp.name, "sessions.json")
+        upload.MAX_RESUME_ATTEMPTS = 0
+        token = upload.upload(
+            "secrets.json", self.media_file, resumable=True,
+            chunk_size=128, session_file=session_file)
+        self.assertIsNone(token)
+        with open(session_file) as f:
+            self.assertIn(os.path.abspath(self.media_file), json.load(f))
+        received = len(self.server.data)
+        self.assertGreater(received, 256)
+
+        token = upload.upload(
+            "secrets.json", self.media_file, resumable=True,
+            chunk_size=128, session_file=session_file)
+        self.assertEqual(token, "upload-token")
+        self.assertEqual(self.server.sessions_started, 1)
+        self.assertEqual(bytes(self.server.data), self.content)
+        with open(session_file) as f:
+            self.assertEqual(json.load(f), {})
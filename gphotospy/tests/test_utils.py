@@ -1,4 +1,9 @@
-from gphotospy.utils import batches
+import gc
+import json
+import time
+import threading
+
+from gphotospy.utils import batches, fields_mask, Paginator, prefetch
 
 
 def test_batches():
@@ -8,3 +13,102 @@ def test_batches():
 	assert list(batches(lst, 10)) == [[0, 1, 2, 3, 4, 5, 6, 7, 8, 9]]
 	assert list(batches(lst, 11)) == [[0, 1, 2, 3, 4, 5, 6, 7, 8, 9]]
 
+
+def fake_pages(n_pages, page_size, fetched):
+	def fetch_page(page_token):
+		page = int(page_token or 0)
+		fetched.append(page)
+		result = {"items": list(range(page * page_size, (page + 1) * page_size))}
+		if page + 1 < n_pages:
+			result["nextPageToken"] = str(page + 1)
+		return result
+	return fetch_page
+
+
+def test_paginate():
+	fetched = []
+	assert list(Paginator(fake_pages(3, 4, fetched), "items")) == list(range(12))
+	assert fetched == [0, 1, 2]
+	assert list(Paginator(lambda token: {}, "items")) == []
+
+
+def test_paginate_prefetch():
+	fetched = []
+	items = Paginator(fake_pages(5, 4, fetched), "items", prefetch_pages=2)
+	assert list(items) == list(range(20))
+	assert fetched == [0, 1, 2, 3, 4]
+
+
+def test_prefetch_cancellation():
+	fetched = []
+	items = Paginator(fake_pages(1000, 4, fetched), "items", prefetch_pages=2)
+	assert next(items) == 0
+	items.close()
+	time.sleep(0.3)
+	count = len(fetched)
+	time.sleep(0.3)
+	# the producer stopped, with at most depth + 2 pages fetched
+	assert len(fetched) == count
+	assert count <= 4
+
+
+def test_prefetch_cancellation_on_break():
+	fetched = []
+	threads = threading.active_count()
+	for item in Paginator(fake_pages(1000, 4, fetched), "items", prefetch_pages=2):
+		break
+	gc.collect()
+	time.sleep(0.3)
+	count = len(fetched)
+	time.sleep(0.3)
+	# leaving the loop is enough to stop the producer
+	assert threading.active_count() == threads
+	assert len(fetched) == count
+	assert count <= 4
+
+
+def test_prefetch_raises_in_consumer():
+	def failing():
+		yield 1
+		raise ValueError("page failed")
+	items = prefetch(failing(), 1)
+	assert next(items) == 1
+	try:
+		next(items)
+		assert False
+	except ValueError as e:
+		assert str(e) == "page failed"
+
+
+def test_paginator_resume_from_checkpoint():
+	fetched = []
+	query = {"pageSize": 4}
+	items = Paginator(fake_pages(5, 4, fetched), "items", query=query)
+	for _ in range(6):
+		next(items)
+	checkpoint = json.loads(json.dumps(items.checkpoint()))
+	assert checkpoint == {"page_token": "1", "position": 2, "query": query}
+
+	resumed = Paginator(fake_pages(5, 4, fetched), "items", 2, query, checkpoint)
+	assert list(resumed) == list(range(6, 20))
+	assert resumed.checkpoint()["page_token"] is None
+
+	# at the end of a page, the checkpoint points to the next page
+	items = Paginator(fake_pages(5, 4, fetched), "items", query=query)
+	for _ in range(4):
+		next(items)
+	assert items.checkpoint()["page_token"] == "1"
+	assert items.checkpoint()["position"] == 0
+
+	try:
+		Paginator(fake_pages(5, 4, fetched), "items", query={}, resume_from=checkpoint)
+		assert False
+	except ValueError:
+		pass
+
+
+def test_fields_mask():
+	assert fields_mask("albums", None) is None
+	assert fields_mask("albums", "id,title") == "nextPageToken,albums(id,title)"
+	assert fields_mask("mediaItems", ["id", "filename"]) == \
+		"nextPageToken,mediaItems(id,filename)"
@@ -0,0 +1,99 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import adaptive, quota, ratelimit
+
+# Number of hosts whose connections are kept alive in the pool
+POOL_CONNECTIONS = 10
+# Maximum number of keep-alive connections for each host
+POOL_MAXSIZE = 10
+# (connect, read) timeouts in seconds
+TIMEOUT = (10, 300)
+
+_lock = threading.Lock()
+_session = None
+_timeout = TIMEOUT
+
+
+def _new_session(pool_connections, pool_maxsize, block):
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=block)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def configure(pool_connections=POOL_CONNECTIONS,
+              pool_maxsize=POOL_MAXSIZE,
+              timeout=TIMEOUT,
+              block=False):
+    """
+    Configures the connection pool shared by uploads and downloads
+
+    Parameters
+    ----------
+    pool_connections: int, optional
+        Number of hosts whose connections are kept alive (default 10)
+    pool_maxsize: int, optional
+        Maximum number of keep-alive connections per host (default 10).
+        Set it at least to the number of threads uploading or downloading
+    timeout: (float, float), optional
+        Connect and read timeouts in seconds (default (10, 300))
+    block: bool, optional
+        If True, a thread waits for a free connection instead of opening
+        one more than pool_maxsize for the same host (default False)
+
+    Examples
+    --------
+    Keep 16 connections per host, for 16 uploading threads
+
+    >>> from gphotospy import transport
+    >>> transport.configure(pool_maxsize=16)
+    >>> media_manager.stage_many(files, workers=16)
+    """
+    global _session, _timeout
+    with _lock:
+        old_session = _session
+        _session = _new_session(pool_connections, pool_maxsize, block)
+        _timeout = timeout
+    if old_session is not None:
+        old_session.close()
+
+
+def get_session():
+    """
+    Returns the shared requests.Session, whose connections are
+    kept alive and reused across threads
+    """
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = _new_session(POOL_CONNECTIONS, POOL_MAXSIZE, False)
+    return _session
+
+
+def post(url, **kwargs):
+    """ POST through the shared pool, with the configured timeouts """
+    quota.charge(quota.API)
+    ratelimit.throttle(quota.API)
+    kwargs.setdefault('timeout', _timeout)
+    response = get_session().post(url, **kwargs)
+    # A throttled transfer lowers the adaptive concurrency
+    adaptive.observe(response.status_code)
+    return response
+
+
+def get(url, **kwargs):
+    """ GET through the shared pool, with the configured timeouts """
+    quota.charge(quota.MEDIA)
+    ratelimit.throttle(quota.MEDIA)
+    kwargs.setdefault('timeout', _timeout)
+    response = get_session().get(url, **kwargs)
+    # A throttled transfer lowers the adaptive concurrency
+    adaptive.observe(response.status_code)
+    return response
@@ -1,13 +1,38 @@
 import os
+import json
+import time
+import logging
+import threading
 import requests
 import mimetypes
+from . import adaptive, transport
+from .executor import retry_after
 from .authorize import get_credentials
 
 upload_url = 'https://photoslibrary.googleapis.com/v1/uploads'
 mimetypes.init()
 
+# Size of each chunk sent by the resumable uploader.
+# It is rounded to a multiple of the granularity required by the server
+CHUNK_SIZE = 8 * 1024 * 1024
+# Number of consecutive failed chunks tolerated before giving up
+MAX_RESUME_ATTEMPTS = 5
+# Base delay (seconds) between resume attempts, doubled at each failure
+RESUME_BACKOFF = 1.0
+# Maximum delay (seconds) asked by a Retry-After header honored
+MAX_RETRY_AFTER = 60.0
+# HTTP statuses of a chunk resumed as the 5xx: the server refused it
+# for now (timeout, throttling)
+RESUME_STATUS = (408, 429)
 
-def upload(secrets, media_file):
+_sessions_lock = threading.Lock()
+
+
+def upload(secrets,
+           media_file,
+           resumable=False,
+           chunk_size=CHUNK_SIZE,
+           session_file=None):
     """
     Uploads files of media to Google Server, to put in Photos
 
@@ -18,11 +43,41 @@ def upload(secrets, media_file):
         as created in the Google Cloud Consolle
     media_file: Path
         Path to the file to upload
+    resumable: bool, optional
+        If True uses the resumable protocol, streaming the file in chunks
+        and resuming from the last byte acknowledged by the server when
+        the connection drops (default False, raw upload)
+    chunk_size: int, optional
+        Size in bytes of each chunk sent by the resumable uploader
+    session_file: Path, optional
+        JSON file where the resumable upload sessions are saved.
+        If set, an interrupted upload of the same file is resumed
+        by a later call instead of starting again from byte zero
 
     Returns
     -------
     Upload Token if successfull, otherwise None
+
+    Examples
+    --------
+    Upload a big video in chunks of 16 MiB,
+    saving the session to be able to resume it
+
+    >>> upload(secrets, 'video.mp4', resumable=True,
+    ...        chunk_size=16 * 1024 * 1024, session_file='uploads.json')
+
+    The number of concurrent uploads adapts to the server, if
+    enabled with adaptive.enable()
     """
+    # Latency is compared among files of similar size
+    with adaptive.slot(adaptive.UPLOAD, os.path.getsize(media_file)):
+        if resumable:
+            return _resumable_upload(
+                secrets, media_file, chunk_size, session_file)
+        return _raw_upload(secrets, media_file)
+
+
+def _raw_upload(secrets, media_file):
     credentials = get_credentials(secrets)
 
     header = {
@@ -33,9 +88,159 @@ def upload(secrets, media_file):
 
     header['X-Goog-Upload-Content-Type'] = mimetypes.guess_type(media_file)[0]
 
-    f = open(media_file, 'rb').read()
-
-    response = requests.post(upload_url, data=f, headers=header)
+    # requests streams file objects, so the file is never held in memory
+    with open(media_file, 'rb') as f:
+        response = transport.post(upload_url, data=f, headers=header)
     if response.ok:
         return response.content.decode('utf-8')
     return None
+
+
+def _load_sessions(session_file):
+    if session_file is None or not os.path.exists(session_file):
+        return {}
+    with open(session_file, 'r') as f:
+        try:
+            return json.load(f)
+        except ValueError:
+            return {}
+
+
+def _save_session(session_file, key, session):
+    if session_file is None:
+        return
+    with _sessions_lock:
+        sessions = _load_sessions(session_file)
+        if session is None:
+            sessions.pop(key, None)
+        else:
+            sessions[key] = session
+        with open(session_file, 'w') as f:
+            json.dump(sessions, f)
+
+
+def _start_session(credentials, media_file, size):
+    header = {
+        'Authorization': "Bearer " + credentials.token,
+        'Content-Length': '0',
+        'X-Goog-Upload-Command': 'start',
+        'X-Goog-Upload-Content-Type': mimetypes.guess_type(media_file)[0],
+        'X-Goog-Upload-Protocol': 'resumable',
+        'X-Goog-Upload-Raw-Size': str(size)
+    }
+    response = transport.post(upload_url, headers=header)
+    if not response.ok:
+        return None
+    return {
+        "url": response.headers['X-Goog-Upload-URL'],
+        "granularity": int(
+            response.headers.get('X-Goog-Upload-Chunk-Granularity', 1)),
+        "size": size,
+        "mtime": os.path.getmtime(media_file)
+    }
+
+
+def _query_session(credentials, session_url):
+    """ Returns (status, bytes received) of an upload session """
+    header = {
+        'Authorization': "Bearer " + credentials.token,
+        'Content-Length': '0',
+        'X-Goog-Upload-Command': 'query'
+    }
+    response = transport.post(session_url, headers=header)
+    if not response.ok:
+        return (None, 0)
+    return (
+        response.headers.get('X-Goog-Upload-Status'),
+        int(response.headers.get('X-Goog-Upload-Size-Received', 0)))
+
+
+def _resumable_upload(secrets, media_file, chunk_size, session_file):
+    credentials = get_credentials(secrets)
+    key = os.path.abspath(media_file)
+    size = os.path.getsize(media_file)
+
+    # Resume a saved session of the same file, if still active
+    session = _load_sessions(session_file).get(key)
+    offset = 0
+    if session is not None:
+        if (session.get("size") == size
+                and session.get("mtime") == os.path.getmtime(media_file)):
+            try:
+                status, offset = _query_session(credentials, session["url"])
+            except requests.exceptions.RequestException:
+                status = None
+            if status != 'active':
+                session = None
+        else:
+            session = None
+    if session is None:
+        offset = 0
+        session = _start_session(credentials, media_file, size)
+        if session is None:
+            return None
+        _save_session(session_file, key, session)
+
+    attempts = 0
+    with open(media_file, 'rb') as f:
+        while True:
+            # Cheap: the credential store refreshes the token only
+            # when it is about to expire during a long upload
+            credentials = get_credentials(secrets)
+            granularity = max(session["granularity"], 1)
+            f.seek(offset)
+            chunk = f.read(max(chunk_size // granularity, 1) * granularity)
+            last = offset + len(chunk) >= size
+            header = {
+                'Authorization': "Bearer " + credentials.token,
+                'Content-Length': str(len(chunk)),
+                'X-Goog-Upload-Command':
+                    'upload, finalize' if last else 'upload',
+                'X-Goog-Upload-Offset': str(offset)
+            }
+            try:
+                response = transport.post(
+                    session["url"], data=chunk, headers=header)
+                if response.ok:
+                    attempts = 0
+                    if last:
+                        _save_session(session_file, key, None)
+                        return response.content.decode('utf-8')
+                    offset += len(chunk)
+                    continue
+                if response.status_code < 500 \
+                        and response.status_code not in RESUME_STATUS:
+                    logging.error('upload of {} failed: {} {}'.format(
+                        media_file, response.status_code, response.text))
+                    return None
+                delay = retry_after(response.headers.get('Retry-After'))
+            except requests.exceptions.RequestException as e:
+                logging.debug('upload of {} interrupted at byte {}: {}'.format(
+                    media_file, offset, e))
+                delay = None
+
+            # Connection dropped, server error or throttling: ask the
+            # server how far it got, and resume from there
+            attempts += 1
+            if attempts > MAX_RESUME_ATTEMPTS:
+                logging.error('upload of {} aborted at byte {}'.format(
+                    media_file, offset))
+                return None
+            if delay is None:
+                delay = RESUME_BACKOFF * 2 ** (attempts - 1)
+            time.sleep(min(delay, MAX_RETRY_AFTER))
+            try:
+                status, received = _query_session(
+                    credentials, session["url"])
+            except requests.exceptions.RequestException:
+                continue
+            if status == 'active':
+                offset = received
+            elif status is not None:
+                # The session is finalized or cancelled, and the
+                # upload token is lost: start over with a new session
+                session = _start_session(credentials, media_file, size)
+                if session is None:
+                    return None
+                _save_session(session_file, key, session)
+                offset = 0
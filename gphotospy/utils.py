@@ -1,3 +1,9 @@
+import calendar
+import datetime
+import threading
+import contextvars
+from queue import Queue, Full
+from concurrent.futures import ThreadPoolExecutor
 from typing import Iterator
 
 
@@ -8,3 +14,194 @@ def batches(lst: list, n: int) -> Iterator[list]:
     """
     for i in range(0, len(lst), n):
         yield lst[i:i + n]
+
+
+def fields_mask(key: str, fields) -> str:
+    """
+    Returns the partial response mask of a paginated list call, asking
+    only the given fields of each item under key, and the page token.
+
+    fields is a string in the API format ("id,mediaMetadata/creationTime")
+    or a list of such fields; None returns None (full response).
+    """
+    if fields is None:
+        return None
+    if not isinstance(fields, str):
+        fields = ",".join(fields)
+    return "nextPageToken,{}({})".format(key, fields)
+
+
+def epoch_seconds(timestamp: str) -> int:
+    """
+    Seconds since the epoch of an API timestamp, such as
+    "2014-10-02T15:01:23.045123456Z" (always UTC); 0 if empty.
+    Fractional seconds are dropped.
+    """
+    if not timestamp:
+        return 0
+    parsed = datetime.datetime.strptime(timestamp[:19], "%Y-%m-%dT%H:%M:%S")
+    return calendar.timegm(parsed.timetuple())
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """
+    ThreadPoolExecutor running each task in the context of the thread
+    that submitted it, so that context variables (e.g. the quota
+    priority) reach the workers
+    """
+
+    def submit(self, fn, *args, **kwargs):
+        return super().submit(
+            contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+_ITEM = 0
+_DONE = 1
+_ERROR = 2
+
+
+def prefetch(iterable, depth: int = 1) -> Iterator:
+    """
+    Iterates over iterable on a background thread,
+    keeping up to depth items ready in a bounded queue.
+
+    Exceptions raised by iterable are raised again to the consumer.
+    If the consumer stops early (or closes the iterator) the background
+    thread stops as soon as its current item is produced.
+    The background thread runs in the context of the caller
+    (e.g. its quota priority).
+    """
+    queue = Queue(maxsize=max(depth, 1))
+    stop = threading.Event()
+
+    def put(entry):
+        while not stop.is_set():
+            try:
+                queue.put(entry, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((_ITEM, item)):
+                    return
+            put((_DONE, None))
+        except BaseException as e:
+            put((_ERROR, e))
+
+    context = contextvars.copy_context()
+    thread = threading.Thread(
+        target=context.run, args=(produce,), daemon=True)
+    thread.start()
+    try:
+        while True:
+            kind, value = queue.get()
+            if kind == _DONE:
+                return
+            if kind == _ERROR:
+                raise value
+            yield value
+    finally:
+        stop.set()
+
+
+def _iter_pages(fetch_page, key, page_token):
+    """ Yields (page_token, items, next_page_token) for each page """
+    while page_token is not None:
+        result = fetch_page(page_token)
+        next_page_token = result.get("nextPageToken", None)
+        yield (page_token, result.get(key) or [], next_page_token)
+        page_token = next_page_token
+
+
+class Paginator:
+    """
+    Iterator over the items of a paginated API list.
+
+    fetch_page(page_token) executes the request for a page and returns
+    the result; key is the name of the list of items in the result.
+    If prefetch_pages > 0, up to that many pages are fetched ahead
+    on a background thread while the current page is consumed.
+
+    At any moment checkpoint() returns a JSON-serializable position of
+    the walk, that can be passed as resume_from to a new Paginator over
+    the same query to continue exactly from the next item.
+
+    If given, transform(item) is applied to each item yielded.
+    """
+
+    def __init__(self,
+                 fetch_page,
+                 key: str,
+                 prefetch_pages: int = 0,
+                 query=None,
+                 resume_from=None,
+                 transform=None):
+        self._transform = transform
+        self._key = key
+        self._query = query
+        page_token = ""
+        self._skip = 0
+        if resume_from is not None:
+            if resume_from.get("query") != query:
+                raise ValueError("checkpoint taken on a different query")
+            page_token = resume_from["page_token"]
+            self._skip = resume_from["position"]
+        # Position of the next item: page token of its page, and index
+        self._page_token = page_token
+        self._next_page_token = page_token
+        self._page = []
+        self._position = self._skip
+        # The pages generator must not hold self: the prefetching thread
+        # keeps it alive, and the Paginator (whose collection stops the
+        # thread) would never be collected
+        self._pages = _iter_pages(fetch_page, key, page_token)
+        if prefetch_pages > 0:
+            self._pages = prefetch(self._pages, prefetch_pages)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while self._position >= len(self._page):
+            if self._next_page_token is None:
+                raise StopIteration
+            try:
+                page_token, page, next_page_token = next(self._pages)
+            except StopIteration:
+                self._next_page_token = None
+                raise
+            self._page_token = page_token
+            self._next_page_token = next_page_token
+            self._page = page
+            self._position = self._skip
+            self._skip = 0
+        item = self._page[self._position]
+        self._position += 1
+        if self._transform is not None:
+            return self._transform(item)
+        return item
+
+    def checkpoint(self) -> dict:
+        """
+        Returns the position of the next item to be yielded, as a dict
+        with the keys "page_token", "position" and "query".
+        A page_token of None means that the walk is complete.
+        """
+        if self._page and self._position >= len(self._page):
+            # Current page consumed: the next item opens the next page
+            page_token, position = self._next_page_token, 0
+        else:
+            page_token, position = self._page_token, self._position
+        return {
+            "page_token": page_token,
+            "position": position,
+            "query": self._query
+        }
+
+    def close(self):
+        """ Stops the walk, and the prefetching thread if any """
+        self._pages.close()
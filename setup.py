@@ -29,6 +29,11 @@ setup(
         "google-api-python-client>=2.1.0",
         "google-auth-httplib2>=0.1.0",
         "google-auth-oauthlib>=0.4.4",
-        "oauth2client>=4.1.3"
+        "httplib2>=0.15.0",
+        "oauth2client>=4.1.3",
+        "requests>=2.22.0"
     ],
+    extras_require={
+        "numpy": ["numpy"]
+    },
 )